@@ -0,0 +1,142 @@
+"""
+Load test of the headless probe engine against a local stand-in server.
+
+Run from the project root:
+
+    python -m benchmarks.bench_engine [--sizes 10 1000 10000] [--duration 20] [--workers N]
+
+Every endpoint is scheduled with a 1 s interval, so the offered load equals
+the endpoint count per second. For each fleet size this reports achieved
+probes/sec, engine CPU time per probe (the server runs in its own process
+and is not counted) and the engine's resident memory sampled over the run.
+With --workers the endpoints are sharded across that many probe worker
+processes; CPU then includes the workers and RSS is the parent's only.
+"""
+import argparse
+import asyncio
+import resource
+import sys
+import time
+
+from benchmarks.standin import start_in_process
+from services.endpoint_state import HealthTracker
+from services.http_pool import SessionPool
+from services.probe_engine import Endpoint, ProbeEngine
+from services.scheduler import EndpointScheduler
+from services.workers import WorkerPool
+
+CONCURRENCY = 100
+SAMPLE_EVERY = 2.0
+
+
+def rss_mb():
+    """Current resident set size in MB (peak RSS where /proc is unavailable)"""
+    try:
+        with open('/proc/self/statm') as f:
+            pages = int(f.read().split()[1])
+        return pages * resource.getpagesize() / 1e6
+    except OSError:
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak / 1e6 if sys.platform == 'darwin' else peak / 1e3
+
+
+def make_endpoints(size, port):
+    return [
+        Endpoint(f"http://127.0.0.1:{port}/health/{i}", timeout=10, interval=1, jitter=0)
+        for i in range(size)
+    ]
+
+
+def cpu_time():
+    children = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return time.process_time() + children.ru_utime + children.ru_stime
+
+
+def run_workers(size, port, duration, workers):
+    pool = WorkerPool(make_endpoints(size, port), workers=workers, concurrency=CONCURRENCY)
+    counts = {'probes': 0, 'failures': 0}
+    memory = []
+
+    def on_result(result):
+        counts['probes'] += 1
+        if not result.ok:
+            counts['failures'] += 1
+
+    def housekeeping():
+        memory.append((time.perf_counter() - start, rss_mb()))
+        if time.perf_counter() - start >= duration:
+            pool.stop()
+
+    start = time.perf_counter()
+    cpu_start = cpu_time()
+    pool.start()
+    pool.run_forever(on_result, housekeeping=housekeeping, housekeeping_interval=SAMPLE_EVERY)
+    return counts, time.perf_counter() - start, cpu_time() - cpu_start, memory
+
+
+async def run(size, port, duration):
+    endpoints = make_endpoints(size, port)
+    engine = ProbeEngine(
+        concurrency=CONCURRENCY,
+        pool=SessionPool(pool_size=CONCURRENCY)
+    )
+    scheduler = EndpointScheduler()
+    scheduler.add_spread(endpoints)
+    counts = {'probes': 0, 'failures': 0}
+    memory = []
+
+    def on_result(result):
+        counts['probes'] += 1
+        if not result.ok:
+            counts['failures'] += 1
+
+    def sample():
+        memory.append((time.perf_counter() - start, rss_mb()))
+
+    def housekeeping():
+        sample()
+        if time.perf_counter() - start >= duration:
+            engine.stop()
+
+    start = time.perf_counter()
+    cpu_start = time.process_time()
+    sample()
+    await engine.run_forever(
+        scheduler,
+        on_result,
+        HealthTracker(),
+        housekeeping=housekeeping,
+        housekeeping_interval=min(SAMPLE_EVERY, duration)
+    )
+    elapsed = time.perf_counter() - start
+    cpu = time.process_time() - cpu_start
+    sample()
+    engine.close()
+    return counts, elapsed, cpu, memory
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10, 1000, 10000])
+    parser.add_argument('--duration', type=float, default=20.0)
+    parser.add_argument('--workers', type=int, default=1)
+    args = parser.parse_args()
+
+    server, port = start_in_process()
+    try:
+        for size in args.sizes:
+            if args.workers > 1:
+                counts, elapsed, cpu, memory = run_workers(size, port, args.duration, args.workers)
+            else:
+                counts, elapsed, cpu, memory = asyncio.run(run(size, port, args.duration))
+            probes = counts['probes']
+            print(f"{size:>6} endpoints: {probes / elapsed:8.1f} probes/s "
+                  f"(offered {size}/s), {cpu * 1000 / max(probes, 1):6.3f} ms CPU/probe, "
+                  f"{counts['failures']} failures")
+            print("        RSS MB over time: " + ", ".join(f"{t:.0f}s={mb:.1f}" for t, mb in memory))
+    finally:
+        server.terminate()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,65 @@
+"""
+Frame time for large bursts of log lines arriving at the UI.
+
+Run from the project root (needs Kivy and a display):
+
+    python -m benchmarks.bench_log_burst
+
+Compares feeding a burst through add_log() one line at a time with a
+single add_logs() call, measuring the ingest call plus the frames it takes
+for the scheduled layout and scroll callbacks to run.
+"""
+import os
+import time
+
+os.environ.setdefault('KIVY_NO_ARGS', '1')
+os.environ.setdefault('KIVY_LOG_MODE', 'PYTHON')
+
+from kivy.base import EventLoop
+from kivy.core.window import Window
+
+from main import LogDisplay
+
+BURST_SIZES = [100, 500, 2000]
+SETTLE_FRAMES = 3
+
+
+def render_frames(count):
+    for _ in range(count):
+        EventLoop.idle()
+
+
+def measure(burst, batched):
+    display = LogDisplay()
+    Window.add_widget(display)
+    render_frames(SETTLE_FRAMES)
+    entries = [(f"[2024-01-01 00:00:00] ✓ Successfully pinged line {i}: 200", True) for i in range(burst)]
+
+    start = time.perf_counter()
+    if batched:
+        display.add_logs(entries)
+    else:
+        for message, success in entries:
+            display.add_log(message, success)
+    ingest = time.perf_counter() - start
+
+    frame_start = time.perf_counter()
+    render_frames(SETTLE_FRAMES)
+    frames = time.perf_counter() - frame_start
+
+    Window.remove_widget(display)
+    return ingest, frames
+
+
+def main():
+    EventLoop.ensure_window()
+    for burst in BURST_SIZES:
+        for batched in (False, True):
+            ingest, frames = measure(burst, batched)
+            label = 'add_logs' if batched else 'add_log '
+            print(f"{burst:>5} lines {label}: ingest {ingest * 1000:8.2f} ms, "
+                  f"next {SETTLE_FRAMES} frames {frames * 1000:8.2f} ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,77 @@
+"""
+Cost per debug log line: the original per-line log_to_file() against the
+buffered BatchWriter/LineFile pair.
+
+Run from the project root:
+
+    python -m benchmarks.bench_log_writer
+
+The original helper resolved the log path, created the directory and
+opened and closed the file for every line (plus a JNI lookup on Android,
+which cannot be reproduced here). The buffered writer resolves the path
+once and writes whole batches from a background thread.
+"""
+import os
+import shutil
+import tempfile
+import time
+from datetime import datetime, timezone
+
+from services.log_writer import BatchWriter, LineFile
+
+LINES = 20000
+
+
+def per_line_log_to_file(directory, message):
+    """The original implementation, minus the Android path lookup"""
+    debug_file = os.path.join(directory, 'service_debug.log')
+    os.makedirs(os.path.dirname(debug_file), exist_ok=True)
+    with open(debug_file, 'a') as f:
+        timestamp = datetime.now(timezone.utc).strftime("%Y-%m-%d %H:%M:%S")
+        f.write(f"[{timestamp}] {message}\n")
+
+
+def bench_per_line(directory):
+    start = time.perf_counter()
+    for i in range(LINES):
+        per_line_log_to_file(directory, f"Service running, line {i}")
+    return time.perf_counter() - start, LINES
+
+
+def bench_buffered(directory, fsync_interval):
+    line_file = LineFile(os.path.join(directory, 'service_debug.log'), fsync_interval=fsync_interval)
+    batches = []
+
+    def write_batch(lines):
+        batches.append(len(lines))
+        line_file.write_batch(lines)
+
+    writer = BatchWriter(write_batch)
+    start = time.perf_counter()
+    for i in range(LINES):
+        timestamp = datetime.now(timezone.utc).strftime("%Y-%m-%d %H:%M:%S")
+        writer.write(f"[{timestamp}] Service running, line {i}\n")
+    writer.close()
+    elapsed = time.perf_counter() - start
+    line_file.close()
+    return elapsed, len(batches)
+
+
+def main():
+    runs = [
+        ('per-line open/close', lambda d: bench_per_line(d)),
+        ('buffered, no fsync', lambda d: bench_buffered(d, None)),
+        ('buffered, fsync each batch', lambda d: bench_buffered(d, 0)),
+    ]
+    for name, run in runs:
+        directory = tempfile.mkdtemp()
+        try:
+            elapsed, writes = run(directory)
+        finally:
+            shutil.rmtree(directory)
+        print(f"{name:28s} {elapsed * 1e6 / LINES:8.2f} us/line, "
+              f"{writes:6d} file writes for {LINES} lines")
+
+
+if __name__ == '__main__':
+    main()
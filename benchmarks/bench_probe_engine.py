@@ -0,0 +1,48 @@
+"""
+Probe 100 endpoints on a local stand-in server that delays every response.
+
+Run from the project root:
+
+    python -m benchmarks.bench_probe_engine
+
+With all probes in flight at once the cycle should finish in roughly one
+delay period instead of endpoints * delay.
+"""
+import time
+
+from benchmarks.standin import start_in_thread
+from services.http_pool import SessionPool
+from services.probe_engine import Endpoint, ProbeEngine
+
+ENDPOINT_COUNT = 100
+DELAY = 2.0
+
+
+def main():
+    server, port = start_in_thread(delay=DELAY)
+
+    endpoints = [
+        Endpoint(f"http://127.0.0.1:{port}/health/{i}", timeout=10)
+        for i in range(ENDPOINT_COUNT)
+    ]
+    engine = ProbeEngine(
+        concurrency=ENDPOINT_COUNT,
+        pool=SessionPool(pool_size=ENDPOINT_COUNT)
+    )
+    try:
+        start = time.perf_counter()
+        results = engine.run_cycle(endpoints)
+        elapsed = time.perf_counter() - start
+        pool_stats = engine.pool.stats()
+    finally:
+        engine.close()
+        server.shutdown()
+
+    ok = sum(1 for r in results if r.ok)
+    print(f"{ok}/{ENDPOINT_COUNT} endpoints ok in {elapsed:.2f}s "
+          f"(delay {DELAY:.1f}s, sequential would take {ENDPOINT_COUNT * DELAY:.0f}s)")
+    print(f"Connection pool: {pool_stats}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,107 @@
+"""
+Encode/decode throughput of service -> UI records: the original JSON lines
+against the struct-based records in services.records.
+
+Run from the project root:
+
+    python -m benchmarks.bench_records
+
+The JSON path is what log_message() and read_service_logs() used to do:
+format the message in the service, json.dumps it, json.loads every line
+in the UI and pick a color by searching the text. The record path packs
+typed fields, unpacks them in the UI and formats only the rows that are
+visible (VISIBLE_ROWS of each batch).
+"""
+import json
+import time
+from datetime import datetime, timezone
+
+from services.endpoint_state import HealthTracker, UP, DEGRADED, DOWN
+from services.probe_engine import Endpoint, ProbeResult
+from services.records import encode, decode, format_record, transition_record
+
+RECORDS = 50000
+VISIBLE_ROWS = 30
+
+
+def make_results():
+    tracker = HealthTracker(down_after=2)
+    results = []
+    for i in range(RECORDS):
+        endpoint = Endpoint(f"https://service-{i % 200}.example.com/api/v1/utils/health-check/")
+        if i % 7 == 0:
+            result = ProbeResult(endpoint, False, latency=30.0, error=TimeoutError("timed out after 30s"))
+        else:
+            result = ProbeResult(endpoint, i % 5 != 0, status_code=200 if i % 5 else 503, latency=0.05 + i % 13 / 100)
+        transition = tracker.observe(result)
+        results.append((result, transition))
+    return [(r, t) for r, t in results if t is not None]
+
+
+def describe(result, transition):
+    """The log line the service used to build before records existed"""
+    url = result.endpoint.url
+    if result.error is not None:
+        text = f"✗ Error pinging {url}: {result.error}"
+    elif result.ok:
+        text = f"✓ Successfully pinged {url}: {result.status_code}"
+    else:
+        text = f"⚠ Ping failed for {url}: {result.status_code}"
+    if transition.new == UP and transition.old in (DEGRADED, DOWN):
+        return f"{text} (recovered after {transition.failures} failed probes)"
+    if transition.new == DEGRADED:
+        return f"{text} (degraded, re-checking)"
+    if transition.new == DOWN:
+        return f"{text} (down after {transition.failures} failed probes, backing off)"
+    return text
+
+
+def json_encode(result, transition):
+    timestamp = datetime.now(timezone.utc).strftime('%Y-%m-%d %H:%M:%S')
+    return json.dumps({
+        'timestamp': timestamp,
+        'message': describe(result, transition),
+        'success': result.ok
+    }).encode('utf-8')
+
+
+def json_decode(line):
+    entry = json.loads(line)
+    message = f"[{entry['timestamp']}] {entry['message']}"
+    return message, ("Error" in message, entry['success'])
+
+
+def timed(function, items):
+    start = time.perf_counter()
+    out = [function(item) for item in items]
+    return out, time.perf_counter() - start
+
+
+def main():
+    results = make_results()
+    count = len(results)
+    print(f"{count} transition records")
+
+    json_lines, json_encode_time = timed(lambda pair: json_encode(*pair), results)
+    _, json_decode_time = timed(json_decode, json_lines)
+
+    binary, record_encode_time = timed(lambda pair: encode(transition_record(*pair)), results)
+    decoded, record_decode_time = timed(decode, binary)
+    _, format_time = timed(format_record, decoded[-VISIBLE_ROWS:])
+
+    def report(label, seconds):
+        print(f"  {label:<28} {count / seconds:>12,.0f} records/s  ({seconds / count * 1e6:6.2f} us/record)")
+
+    print("JSON")
+    report("encode (format + dumps)", json_encode_time)
+    report("decode (loads + color)", json_decode_time)
+    print("struct records")
+    report("encode", record_encode_time)
+    report("decode", record_decode_time)
+    print(f"  format {VISIBLE_ROWS} visible rows      {format_time * 1000:10.3f} ms")
+    print(f"bytes per record: JSON {sum(map(len, json_lines)) / count:.0f}, "
+          f"struct {sum(map(len, binary)) / count:.0f}")
+
+
+if __name__ == '__main__':
+    main()
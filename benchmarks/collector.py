@@ -0,0 +1,101 @@
+"""
+Local stand-in for the result collector.
+
+Accepts the gzip JSON batches posted by services.upload_queue, drops
+records it has already seen (by device and sequence number) and prints a
+line per batch. Run with `python -m benchmarks.collector --port 8099` and
+point the [collector] url in endpoints.toml at http://127.0.0.1:8099/.
+"""
+import argparse
+import gzip
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class CollectorServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, fail_every=0, verbose=True):
+        super().__init__(address, CollectorHandler)
+        # Reject every Nth batch with a 503, to exercise client retries
+        self.fail_every = fail_every
+        self.verbose = verbose
+        self.lock = threading.Lock()
+        self.batches = 0
+        self.seen = {}
+        self.records = []
+        self.duplicates = 0
+
+
+class CollectorHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def _reply(self, status, payload):
+        body = json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self):
+        server = self.server
+        data = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        with server.lock:
+            server.batches += 1
+            if server.fail_every and server.batches % server.fail_every == 0:
+                self._reply(503, {'error': 'injected failure'})
+                return
+        try:
+            if self.headers.get('Content-Encoding') == 'gzip':
+                data = gzip.decompress(data)
+            batch = json.loads(data)
+            device, records = batch['device'], batch['records']
+        except (OSError, ValueError, KeyError) as e:
+            self._reply(400, {'error': str(e)})
+            return
+
+        with server.lock:
+            seen = server.seen.setdefault(device, set())
+            accepted = 0
+            for record in records:
+                if record['seq'] in seen:
+                    server.duplicates += 1
+                    continue
+                seen.add(record['seq'])
+                server.records.append((device, record))
+                accepted += 1
+        if server.verbose:
+            print(f"{device[:8]}: {len(records)} records ({accepted} new, "
+                  f"seq {records[0]['seq']}-{records[-1]['seq']}, {len(data)} bytes uncompressed)", flush=True)
+        self._reply(200, {'accepted': accepted})
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_in_thread(fail_every=0):
+    """Serve from a daemon thread of this process; returns (server, port)"""
+    server = CollectorServer(('127.0.0.1', 0), fail_every=fail_every, verbose=False)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, server.server_address[1]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Stand-in collector for uploaded probe results")
+    parser.add_argument('--port', type=int, default=8099)
+    parser.add_argument('--fail-every', type=int, default=0, help="reject every Nth batch with a 503")
+    args = parser.parse_args(argv)
+
+    server = CollectorServer(('127.0.0.1', args.port), fail_every=args.fail_every)
+    print(f"Collecting on http://127.0.0.1:{args.port}/", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    print(f"{server.batches} batches, {len(server.records)} records, {server.duplicates} duplicates")
+
+
+if __name__ == '__main__':
+    main()
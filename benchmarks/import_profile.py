@@ -0,0 +1,91 @@
+"""
+Import-time profile of the app and service entry modules.
+
+Run from the project root:
+
+    python -m benchmarks.import_profile [--top 15] [--json report.json] [--baseline report.json]
+
+Each module is imported in a fresh interpreter with `-X importtime`. The
+report lists the total import time and the slowest imports by cumulative
+time. Save a report with --json and pass it back with --baseline later to
+see which imports regressed.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+TARGETS = ['services.ping_service', 'main']
+REGRESSION_THRESHOLD_MS = 5.0
+
+
+def profile(module, exclude=()):
+    """
+    {imported module: cumulative ms} for a cold import of `module`, leaving
+    out names in `exclude` (what the interpreter imports on its own).
+    """
+    env = dict(os.environ, KIVY_NO_ARGS='1', KIVY_NO_CONSOLELOG='1')
+    code = f'import {module}' if module else 'pass'
+    proc = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', code],
+        capture_output=True,
+        text=True,
+        env=env
+    )
+    if proc.returncode != 0:
+        last_line = (proc.stderr.strip().splitlines() or ['unknown error'])[-1]
+        raise RuntimeError(f"import {module} failed: {last_line}")
+    times = {}
+    for line in proc.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative_us, name = line[len('import time:'):].split('|')
+        name = name.strip()
+        if name not in exclude:
+            times.setdefault(name, int(cumulative_us) / 1000)
+    return times
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Import-time profile of the entry modules")
+    parser.add_argument('modules', nargs='*', default=TARGETS)
+    parser.add_argument('--top', type=int, default=15)
+    parser.add_argument('--json', help="write the full report to this file")
+    parser.add_argument('--baseline', help="compare against a report saved with --json")
+    args = parser.parse_args()
+
+    baseline = {}
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+
+    startup = set(profile(None))
+    report = {}
+    for module in args.modules:
+        try:
+            times = profile(module, exclude=startup)
+        except RuntimeError as e:
+            print(e)
+            continue
+        report[module] = times
+        total = times.get(module, 0.0)
+        print(f"{module}: {total:.1f} ms total")
+        for name, ms in sorted(times.items(), key=lambda item: -item[1])[:args.top]:
+            print(f"    {ms:8.1f} ms  {name}")
+
+        before = baseline.get(module)
+        if before:
+            print(f"  vs baseline: {total - before.get(module, 0.0):+.1f} ms total")
+            for name, ms in sorted(times.items(), key=lambda item: -item[1]):
+                delta = ms - before.get(name, 0.0)
+                if delta >= REGRESSION_THRESHOLD_MS:
+                    print(f"    {delta:+8.1f} ms  {name}")
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(report, f, indent=1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,63 @@
+"""Local stand-in HTTP server for the benchmarks"""
+import multiprocessing
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+def make_handler(delay=0.0, body=b'ok'):
+    class StandInHandler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def _respond(self, send_body):
+            if delay:
+                time.sleep(delay)
+            self.send_response(200)
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            if send_body:
+                self.wfile.write(body)
+
+        def do_GET(self):
+            self._respond(True)
+
+        def do_HEAD(self):
+            self._respond(False)
+
+        def log_message(self, format, *args):
+            pass
+
+    return StandInHandler
+
+
+class StandInServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 1024
+
+    def handle_error(self, request, client_address):
+        # Probes that stop reading early reset the connection; that is expected
+        pass
+
+
+def start_in_thread(delay=0.0, body=b'ok'):
+    """Serve from a daemon thread of this process; returns (server, port)"""
+    server = StandInServer(('127.0.0.1', 0), make_handler(delay, body))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, server.server_address[1]
+
+
+def _serve(port_queue, delay, body):
+    server = StandInServer(('127.0.0.1', 0), make_handler(delay, body))
+    port_queue.put(server.server_address[1])
+    server.serve_forever()
+
+
+def start_in_process(delay=0.0, body=b'ok'):
+    """
+    Serve from a separate process, so the server's CPU time is not counted
+    against the code being measured. Returns (process, port).
+    """
+    port_queue = multiprocessing.Queue()
+    process = multiprocessing.Process(target=_serve, args=(port_queue, delay, body), daemon=True)
+    process.start()
+    return process, port_queue.get(timeout=10)
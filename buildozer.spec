@@ -22,7 +22,7 @@ source.include_exts = py,png,jpg,kv,atlas,toml
 source.exclude_exts = app_copy.zip
 
 # (list) List of directory to exclude (let empty to not exclude anything)
-source.exclude_dirs = temp, bin, dist, .venv, __pycache__
+source.exclude_dirs = temp, bin, dist, .venv, __pycache__, benchmarks
 
 # (list) List of exclusions using pattern matching
 # Do not prefix with './'
@@ -37,7 +37,7 @@ version = 0.1
 
 # (list) Application requirements
 # comma separated e.g. requirements = sqlite3,kivy
-requirements = python3, kivy, kivy_reloader, toml, trio, attrs, outcome, sniffio, sortedcontainers, exceptiongroup, plyer
+requirements = python3, kivy, kivy_reloader, toml, trio, attrs, outcome, sniffio, sortedcontainers, exceptiongroup, plyer, dnspython
 
 # (str) Custom source folders for requirements
 # Sets custom source for any requirements with recipes
@@ -0,0 +1,107 @@
+"""
+Dashboard widgets: one tile per endpoint with its state, uptime and a
+latency sparkline.
+
+Kept out of main.py so none of it is imported until the dashboard is
+first opened.
+"""
+from kivy.uix.boxlayout import BoxLayout
+from kivy.uix.label import Label
+from kivy.uix.scrollview import ScrollView
+from kivy.uix.gridlayout import GridLayout
+from kivy.uix.widget import Widget
+from kivy.graphics import Color, Line
+from kivy.metrics import dp
+
+STATE_COLORS = {
+    'up': (0.3, 1, 0.3, 1),
+    'degraded': (1, 0.6, 0, 1),
+    'down': (1, 0.3, 0.3, 1),
+}
+
+class Sparkline(Widget):
+    """Line chart of recent latencies; gaps (failed probes) drop to the baseline"""
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.values = []
+        with self.canvas:
+            Color(0.4, 0.7, 1, 1)
+            self._line = Line(points=[], width=dp(1.2))
+        self.bind(pos=self._redraw, size=self._redraw)
+
+    def set_values(self, values):
+        self.values = list(values)
+        self._redraw()
+
+    def _redraw(self, *args):
+        if len(self.values) < 2:
+            self._line.points = []
+            return
+        peak = max((v for v in self.values if v is not None), default=0) or 1
+        step = self.width / (len(self.values) - 1)
+        points = []
+        for i, value in enumerate(self.values):
+            points.append(self.x + i * step)
+            points.append(self.y + self.height * (value or 0) / peak)
+        self._line.points = points
+
+class EndpointTile(BoxLayout):
+    """Dashboard tile for one endpoint: state, uptime and latency sparkline"""
+
+    def __init__(self, url, **kwargs):
+        super().__init__(**kwargs)
+        self.orientation = 'vertical'
+        self.size_hint_y = None
+        self.height = dp(80)
+        self.padding = dp(5)
+
+        row = BoxLayout(orientation='horizontal', size_hint_y=None, height=dp(30))
+        self.url_label = Label(text=url, size_hint=(0.55, 1), shorten=True, halign='left')
+        self.url_label.bind(size=self.url_label.setter('text_size'))
+        self.state_label = Label(text='-', size_hint=(0.15, 1))
+        self.uptime_label = Label(text='-', size_hint=(0.3, 1), halign='right')
+        self.uptime_label.bind(size=self.uptime_label.setter('text_size'))
+        row.add_widget(self.url_label)
+        row.add_widget(self.state_label)
+        row.add_widget(self.uptime_label)
+        self.add_widget(row)
+
+        self.sparkline = Sparkline()
+        self.add_widget(self.sparkline)
+
+    def refresh(self, aggregate):
+        state = aggregate.state or '-'
+        if self.state_label.text != state:
+            self.state_label.text = state
+            self.state_label.color = STATE_COLORS.get(aggregate.state, (1, 1, 1, 1))
+        latency = aggregate.last_latency
+        uptime = f"{aggregate.uptime:.1f}% up"
+        if latency is not None:
+            uptime += f", {latency:.0f} ms"
+        if self.uptime_label.text != uptime:
+            self.uptime_label.text = uptime
+        self.sparkline.set_values(aggregate.latencies)
+
+class Dashboard(ScrollView):
+    """
+    One tile per endpoint. Tiles are only touched when their endpoint had
+    a new result, so the cost of a refresh follows the number of updates,
+    not the number of endpoints.
+    """
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.do_scroll_x = False
+        self.tiles = {}
+        self.grid = GridLayout(cols=1, spacing=dp(4), size_hint_y=None)
+        self.grid.bind(minimum_height=self.grid.setter('height'))
+        self.add_widget(self.grid)
+
+    def refresh(self, aggregates):
+        for aggregate in aggregates.take_dirty():
+            tile = self.tiles.get(aggregate.url)
+            if tile is None:
+                tile = self.tiles[aggregate.url] = EndpointTile(aggregate.url)
+                self.grid.add_widget(tile)
+            tile.refresh(aggregate)
@@ -1,33 +1,45 @@
-import kivy
 from kivy.app import App
 from kivy.uix.boxlayout import BoxLayout
-from kivy.uix.scrollview import ScrollView
 from kivy.uix.label import Label
 from kivy.uix.button import Button
-from kivy.properties import StringProperty, ObjectProperty
-from kivy.core.window import Window
+from kivy.uix.recycleview import RecycleView
+from kivy.uix.recycleview.views import RecycleDataViewBehavior
+from kivy.uix.recycleboxlayout import RecycleBoxLayout
+from kivy.animation import Animation
+from kivy.properties import NumericProperty
 from kivy.clock import Clock
 from kivy.metrics import dp
-from kivy.uix.gridlayout import GridLayout
-from kivy.animation import Animation
-import json
 import os
 from datetime import datetime, timezone
 import threading
-from jnius import autoclass, cast
 from kivy.utils import platform
 
 from kivy.logger import Logger
-from kivy.base import EventLoop
 
+from services.aggregates import DashboardAggregates
+from services.log_channel import LogReader, ChangeListener
+from services.records import (
+    decode, format_record, message_record, KIND_MESSAGE, KIND_PROBE, STATUS_OK, STATUS_FAILED
+)
+from services.log_writer import BatchWriter, LineFile
+
+# pyjnius, the android module, the notification helper and the dashboard
+# widgets are imported where they are used, so none of them sit on the
+# cold start path.
+
+# Constants
+SERVICE_NAME = 'Ping_service'
+PACKAGE_DOMAIN = 'com.alchris'
+PACKAGE_NAME = 'pinger'
+MAX_LOG_LINES = 2000
 
-if platform == "android":
+def request_android_permissions():
+    """
+    Ask for any missing Android permissions in one asynchronous request.
+    Called after the first frame so the dialog never delays startup.
+    """
     try:
         from android.permissions import request_permissions, Permission, check_permission
-        # from android import loadingscreen
-        
-        # Hide loading screen
-        # loadingscreen.hide_loading_screen()
         
         # Request all necessary permissions
         permissions = [
@@ -40,17 +52,17 @@ if platform == "android":
             Permission.SYSTEM_ALERT_WINDOW
         ]
         
-        for permission in permissions:
-            if not check_permission(permission):
-                request_permissions([permission])
+        missing = [p for p in permissions if not check_permission(p)]
+        if missing:
+            request_permissions(
+                missing,
+                lambda permissions, grants: log_to_file(
+                    f"Permissions granted: {sum(grants)}/{len(grants)}"
+                )
+            )
     except Exception as e:
         print(f"Error setting up Android permissions: {e}")
 
-# Constants
-SERVICE_NAME = 'Ping_service'
-PACKAGE_DOMAIN = 'com.alchris'
-PACKAGE_NAME = 'pinger'
-
 def get_android_external_files_dir():
     """Get the Android external files directory path"""
     try:
@@ -72,15 +84,24 @@ def get_log_file_path(filename):
         print(f"Error getting log file path: {e}")
         return None
 
+_debug_log = None
+
+def get_debug_log():
+    """Return the buffered writer for debug.log, creating it on first use"""
+    global _debug_log
+    if _debug_log is None:
+        debug_file = get_log_file_path('debug.log')
+        if debug_file:
+            _debug_log = BatchWriter(LineFile(debug_file).write_batch)
+    return _debug_log
+
 def log_to_file(message):
     """Helper function to log messages to a debug file"""
     try:
-        debug_file = get_log_file_path('debug.log')
-        if debug_file:
-            os.makedirs(os.path.dirname(debug_file), exist_ok=True)
-            with open(debug_file, 'a') as f:
-                timestamp = datetime.now(timezone.utc).strftime("%Y-%m-%d %H:%M:%S")
-                f.write(f"[{timestamp}] {message}\n")
+        debug_log = get_debug_log()
+        if debug_log:
+            timestamp = datetime.now(timezone.utc).strftime("%Y-%m-%d %H:%M:%S")
+            debug_log.write(f"[{timestamp}] {message}\n")
     except Exception as e:
         print(f"Error writing to debug log: {e}")
 
@@ -98,7 +119,68 @@ class CustomButton(Button):
         anim = Animation(background_color=(0.8, 0.2, 0.2, 1), duration=0.1)
         anim.start(self)
 
-class LogDisplay(ScrollView):
+def log_color(message, success):
+    """Text color for a log line"""
+    if "Error" in message:
+        return (1, 0.3, 0.3, 1)
+    elif not success:
+        return (1, 0.6, 0, 1)
+    return (0.3, 1, 0.3, 1)
+
+def record_color(record):
+    """Text color for a service record; probe records carry their status"""
+    if record.kind == KIND_MESSAGE:
+        return log_color(record.detail, record.status == STATUS_OK)
+    if record.status == STATUS_OK:
+        return (0.3, 1, 0.3, 1)
+    elif record.status == STATUS_FAILED:
+        return (1, 0.6, 0, 1)
+    return (1, 0.3, 0.3, 1)
+
+class LogRow(RecycleDataViewBehavior, Label):
+    """A single visible log line; rows are recycled as the view scrolls"""
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.index = None
+        self.log_view = None
+        self.size_hint_y = None
+        self.markup = True
+        self.padding = (dp(10), dp(5))
+        self.bind(width=self._update_text_size, texture_size=self._update_height)
+
+    def refresh_view_attrs(self, rv, index, data):
+        self.index = index
+        self.log_view = rv
+        # Records are only turned into text once their row is on screen
+        record = data['record']
+        self.text = format_record(record)
+        self.color = record_color(record)
+        attrs = {key: value for key, value in data.items() if key != 'record'}
+        return super().refresh_view_attrs(rv, index, attrs)
+
+    def _update_text_size(self, instance, width):
+        self.text_size = (width - dp(20), None)
+
+    def _update_height(self, instance, size):
+        # Wrapped lines only know their height once rendered, so store it
+        # in the data item and let the layout pick it up
+        if self.log_view is None or self.index is None:
+            return
+        if self.index < len(self.log_view.data):
+            self.log_view.set_row_height(self.index, size[1])
+
+class LogDisplay(RecycleView):
+    """
+    Virtualized log view.
+
+    Log lines live in a bounded list of plain dicts holding the decoded
+    records, and only the rows that are on screen have widgets and
+    formatted text, so memory and layout cost stay flat no matter how many
+    lines the service has produced.
+    """
+    max_lines = NumericProperty(MAX_LOG_LINES)
+
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
         self.size_hint = (1, 1)
@@ -107,43 +189,54 @@ class LogDisplay(ScrollView):
         self.scroll_type = ['bars', 'content']
         self.bar_color = [0.5, 0.5, 0.5, 0.7]
         self.bar_inactive_color = [0.5, 0.5, 0.5, 0.4]
+        self.viewclass = LogRow
         
-        self.log_layout = GridLayout(
-            cols=1,
+        self.log_layout = RecycleBoxLayout(
+            orientation='vertical',
             spacing=dp(2),
             padding=dp(5),
-            size_hint_y=None
+            size_hint_y=None,
+            default_size=(None, dp(30)),
+            default_size_hint=(1, None),
+            key_size='row_size'
         )
         self.log_layout.bind(minimum_height=self.log_layout.setter('height'))
         self.add_widget(self.log_layout)
+        self._relayout = Clock.create_trigger(lambda dt: self.refresh_from_data())
+        self._scroll_to_bottom = Clock.create_trigger(lambda dt: setattr(self, 'scroll_y', 0))
+
+    def set_row_height(self, index, height):
+        item = self.data[index]
+        if item.get('row_size', (None, None))[1] != height:
+            item['row_size'] = (None, height)
+            self._relayout()
 
     def add_log(self, message, success=True):
-        label = Label(
-            text=message,
-            size_hint_y=None,
-            markup=True,
-            padding=(dp(10), dp(5))
-        )
-        
-        wrap_width = Window.width - dp(50)
-        label.text_size = (wrap_width, None)
-        
-        label.bind(texture_size=lambda instance, size: setattr(instance, 'height', size[1]))
-        label.bind(width=lambda instance, width: setattr(instance, 'text_size', (wrap_width, None)))
-        
-        if "Error" in message:
-            label.color = (1, 0.3, 0.3, 1)
-        elif not success:
-            label.color = (1, 0.6, 0, 1)
-        else:
-            label.color = (0.3, 1, 0.3, 1)
-        
-        self.log_layout.add_widget(label)
-        Clock.schedule_once(lambda dt: setattr(self, 'scroll_y', 0))
+        self.add_logs([(message, success)])
+
+    def add_logs(self, entries):
+        """Append many preformatted (message, success) entries in one update"""
+        self.add_records([message_record(message, success) for message, success in entries])
+
+    def add_records(self, records):
+        """
+        Append many service records in one update.
+
+        The data list is extended and trimmed once and the scroll to the
+        bottom is coalesced, so a burst costs a single layout pass.
+        """
+        rows = [{'record': record} for record in records]
+        if not rows:
+            return
+        self.data.extend(rows)
+        excess = len(self.data) - self.max_lines
+        if excess > 0:
+            del self.data[:excess]
+        self._scroll_to_bottom()
 
     def clear_logs(self):
         def clear_and_add_header(dt):
-            self.log_layout.clear_widgets()
+            self.data = []
             timestamp = datetime.now(timezone.utc).strftime("%Y-%m-%d %H:%M:%S")
             self.add_log(f"[{timestamp}] Logs cleared by user: al-chris", True)
         Clock.schedule_once(clear_and_add_header, 0)
@@ -159,15 +252,23 @@ class ControlPanel(BoxLayout):
 
         self.clear_button = CustomButton(
             text='Clear Logs',
-            size_hint=(0.3, 1),
+            size_hint=(0.25, 1),
             font_size=dp(16),
             bold=True
         )
         self.add_widget(self.clear_button)
 
+        self.view_button = CustomButton(
+            text='Dashboard',
+            size_hint=(0.25, 1),
+            font_size=dp(16),
+            bold=True
+        )
+        self.add_widget(self.view_button)
+
         self.status_label = Label(
-            text='Status: Running',
-            size_hint=(0.7, 1),
+            text='Status: waiting for probes',
+            size_hint=(0.5, 1),
             halign='right'
         )
         self.add_widget(self.status_label)
@@ -195,17 +296,39 @@ class MainLayout(BoxLayout):
 
         self.log_display = LogDisplay()
         self.content.add_widget(self.log_display)
+        # Built on first use, see show_dashboard()
+        self.dashboard = None
 
         self.control_panel = ControlPanel()
         self.content.add_widget(self.control_panel)
         
         self.add_widget(self.content)
 
+    @property
+    def showing_dashboard(self):
+        return self.dashboard is not None and self.dashboard.parent is self.content
+
+    def show_dashboard(self, show):
+        """Swap the dashboard in place of the log view, or back"""
+        if show == self.showing_dashboard:
+            return
+        if self.dashboard is None:
+            from dashboard import Dashboard
+            self.dashboard = Dashboard()
+        old, new = (self.log_display, self.dashboard) if show else (self.dashboard, self.log_display)
+        index = self.content.children.index(old)
+        self.content.remove_widget(old)
+        self.content.add_widget(new, index=index)
+
 class PingApp(App):
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
         # Add this to track if build has been called
         self._built = False
+        self._log_reader = None
+        self._probe_reader = None
+        self._reading_logs = False
+        self.aggregates = DashboardAggregates()
         
     def build(self):
         try:
@@ -219,12 +342,12 @@ class PingApp(App):
             self.main_layout.control_panel.clear_button.bind(
                 on_release=lambda x: self.main_layout.log_display.clear_logs()
             )
+            self.main_layout.control_panel.view_button.bind(
+                on_release=lambda x: self.toggle_view()
+            )
 
-            # Schedule service start after a short delay
-            Clock.schedule_once(self.start_background_service, 2)
-            
             # Start the log reader
-            Clock.schedule_interval(self.read_service_logs, 1.0)
+            self.start_log_listener()
             
             # Add error checking
             if not self.main_layout:
@@ -244,8 +367,11 @@ class PingApp(App):
             Logger.info("PingApp: on_start() called")
             super().on_start()
             
-            # Add this to ensure the window is shown
-            # EventLoop.window.show()
+            # The UI is up: start the service on the next frame and ask for
+            # permissions once that frame has been drawn
+            Clock.schedule_once(self.start_background_service, 0)
+            if platform == "android":
+                Clock.schedule_once(lambda dt: request_android_permissions(), 0.5)
             
         except Exception as e:
             Logger.error(f"PingApp: Error in on_start(): {e}")
@@ -261,18 +387,40 @@ class PingApp(App):
         if hasattr(self, 'main_layout'):
             Clock.schedule_once(lambda dt: self.main_layout.log_display.clear_logs(), 0.1)
 
+    def toggle_view(self):
+        """Switch between the log and the dashboard"""
+        layout = self.main_layout
+        button = layout.control_panel.view_button
+        if not layout.showing_dashboard:
+            layout.show_dashboard(True)
+            button.text = 'Log'
+            # Tiles are not refreshed while hidden; catch up now
+            layout.dashboard.refresh(self.aggregates)
+        else:
+            layout.show_dashboard(False)
+            button.text = 'Dashboard'
+
+    def apply_probes(self, probes):
+        """Fold new probe records into the aggregates, on the UI thread"""
+        for record in probes:
+            self.aggregates.update(record.url, record.status == STATUS_OK, record.latency_ms, record.state)
+        self.main_layout.control_panel.status_label.text = f"Status: {self.aggregates.summary()}"
+        if self.main_layout.showing_dashboard:
+            self.main_layout.dashboard.refresh(self.aggregates)
+
     def start_background_service(self, dt=None):
         try:
             log_to_file("Attempting to start background service...")
 
-            from services.ping_service import send_android_notification
-
-            send_android_notification(title="Al-Chris", message="Attempting to start background service...")
-            
             if platform != "android":
                 log_to_file("Not on Android platform")
                 return
 
+            from jnius import autoclass
+            from services.notifier import Notifier
+
+            Notifier().post("Al-Chris", "Attempting to start background service...")
+
             # Get the service class
             service = autoclass(f'{PACKAGE_DOMAIN}.{PACKAGE_NAME}.Service{SERVICE_NAME}')
 
@@ -283,7 +431,7 @@ class PingApp(App):
             context = mActivity.getApplicationContext()
             
             # Get the log file path using our new function
-            log_file = get_log_file_path('service_logs.json')
+            log_file = get_log_file_path('service_logs.bin')
             if not log_file:
                 raise Exception("Could not determine log file path")
                 
@@ -315,12 +463,13 @@ class PingApp(App):
     def stop_service(self, dt=None):
         if platform == "android":
             from android import mActivity
+            from jnius import autoclass
             context = mActivity.getApplicationContext()
 
 
-            SERVICE_NAME = f'{PACKAGE_DOMAIN}.{PACKAGE_NAME}.Service{SERVICE_NAME}'
+            service_class_name = f'{PACKAGE_DOMAIN}.{PACKAGE_NAME}.Service{SERVICE_NAME}'
 
-            Service = autoclass(SERVICE_NAME)
+            Service = autoclass(service_class_name)
 
             Intent = autoclass('android.content.Intent')
             service_intent = Intent(mActivity, Service)
@@ -329,34 +478,60 @@ class PingApp(App):
             mActivity.stopService(service_intent)
 
 
+    def start_log_listener(self):
+        """Read service logs whenever the service signals new records"""
+        if platform != "android":
+            return
+        try:
+            listener = ChangeListener()
+        except OSError as e:
+            log_to_file(f"Change listener unavailable, polling service logs: {e}")
+            Clock.schedule_interval(self.read_service_logs, 1.0)
+            return
+        threading.Thread(
+            target=self._listen_for_service_logs,
+            args=(listener,),
+            daemon=True
+        ).start()
+
+    def _listen_for_service_logs(self, listener):
+        # Catch up on anything written before the listener existed
+        self._read_service_logs_worker()
+        while True:
+            listener.wait()
+            self._read_service_logs_worker()
+
     def read_service_logs(self, dt):
+        if platform != "android" or self._reading_logs:
+            return
+        # File reads and record decoding happen on a worker thread; the UI
+        # thread only receives the decoded batch
+        self._reading_logs = True
+        threading.Thread(target=self._read_service_logs_worker, daemon=True).start()
+
+    def _read_service_logs_worker(self):
         try:
-            if platform != "android":
-                return
-            
-            log_file = get_log_file_path('service_logs.json')
-            if not log_file:
-                return
-            
-            if os.path.exists(log_file):
-                with open(log_file, 'r') as f:
-                    lines = f.readlines()
-                
-                if lines:  # Only clear if we have lines to process
-                    # Clear the file
-                    with open(log_file, 'w') as f:
-                        pass
-                    
-                    # Process each line
-                    for line in lines:
-                        try:
-                            log_entry = json.loads(line.strip())
-                            message = f"[{log_entry['timestamp']}] {log_entry['message']}"
-                            self.main_layout.log_display.add_log(message, log_entry['success'])
-                        except json.JSONDecodeError:
-                            continue
+            if self._log_reader is None:
+                log_file = get_log_file_path('service_logs.bin')
+                if not log_file:
+                    return
+                self._log_reader = LogReader(log_file)
+                self._probe_reader = LogReader(get_log_file_path('probe_results.bin'))
+
+            # Decoding is a struct unpack per record; text is only built
+            # for the rows that get displayed
+            records = [decode(data) for data in self._log_reader.read_new()]
+            if records:
+                Clock.schedule_once(lambda dt: self.main_layout.log_display.add_records(records))
+
+            probes = [decode(data) for data in self._probe_reader.read_new()]
+            probes = [record for record in probes if record.kind == KIND_PROBE]
+            if probes:
+                Clock.schedule_once(lambda dt: self.apply_probes(probes))
         except Exception as e:
             log_to_file(f"Error reading service logs: {e}")
+        finally:
+            self._reading_logs = False
 
 if __name__ == "__main__":
     try:
@@ -0,0 +1,75 @@
+from collections import deque
+
+from services.endpoint_state import UP, DEGRADED, DOWN
+
+DEFAULT_WINDOW = 60
+
+
+class EndpointAggregate:
+    """Running totals for one endpoint, updated in constant time per probe"""
+
+    def __init__(self, url, window=DEFAULT_WINDOW):
+        self.url = url
+        self.state = None
+        self.probes = 0
+        self.successes = 0
+        self.last_latency = None
+        # Latency (ms) of the most recent probes, oldest first; None for
+        # probes without a response
+        self.latencies = deque(maxlen=window)
+
+    @property
+    def uptime(self):
+        """Percentage of successful probes, None before the first probe"""
+        if not self.probes:
+            return None
+        return 100.0 * self.successes / self.probes
+
+    def update(self, ok, latency_ms, state):
+        self.probes += 1
+        if ok:
+            self.successes += 1
+        self.last_latency = latency_ms
+        self.latencies.append(latency_ms)
+        self.state = state
+
+
+class DashboardAggregates:
+    """
+    Per-endpoint aggregates behind the dashboard.
+
+    update() does a constant amount of work per probe result and never
+    looks at history. Endpoints touched since the last take_dirty() are
+    tracked so the UI only redraws their tiles, and the number of
+    endpoints in each state is kept as a running count for the status line.
+    """
+
+    def __init__(self, window=DEFAULT_WINDOW):
+        self.window = window
+        self.endpoints = {}
+        self.state_counts = {}
+        self._dirty = set()
+
+    def update(self, url, ok, latency_ms, state):
+        aggregate = self.endpoints.get(url)
+        if aggregate is None:
+            aggregate = self.endpoints[url] = EndpointAggregate(url, self.window)
+        if aggregate.state != state:
+            if aggregate.state is not None:
+                self.state_counts[aggregate.state] -= 1
+            self.state_counts[state] = self.state_counts.get(state, 0) + 1
+        aggregate.update(ok, latency_ms, state)
+        self._dirty.add(url)
+
+    def take_dirty(self):
+        """Endpoints updated since the previous call"""
+        dirty, self._dirty = self._dirty, set()
+        return [self.endpoints[url] for url in dirty]
+
+    def summary(self):
+        """Status line such as '3 up, 1 down'"""
+        parts = [
+            f"{self.state_counts[state]} {state}" for state in (UP, DEGRADED, DOWN)
+            if self.state_counts.get(state)
+        ]
+        return ', '.join(parts) if parts else 'waiting for probes'
@@ -0,0 +1,219 @@
+import os
+import tomllib
+
+from services.probe_engine import Endpoint, PROBE_MODES, MODE_HEAD, MODE_HEADERS
+from services.wake_policy import WAKE_MODES
+
+ENDPOINT_OPTIONS = (
+    'method', 'expected_status', 'body_contains', 'interval', 'jitter', 'timeout',
+    'mode', 'max_body_bytes', 'conditional', 'addresses',
+)
+
+COLLECTOR_OPTIONS = ('url', 'device_id', 'batch_size', 'max_batch_age')
+SCHEDULE_OPTIONS = ('mode', 'window')
+
+
+def _is_number(value):
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+def _check_options(url, options):
+    """Raise ValueError unless every option has a usable type and range"""
+    for name in ('interval', 'timeout'):
+        if name in options and not (_is_number(options[name]) and options[name] > 0):
+            raise ValueError(f"{url}: {name} must be a positive number")
+    if 'jitter' in options and not (_is_number(options['jitter']) and options['jitter'] >= 0):
+        raise ValueError(f"{url}: jitter must be a number >= 0")
+    if 'max_body_bytes' in options:
+        value = options['max_body_bytes']
+        if not (isinstance(value, int) and not isinstance(value, bool) and value > 0):
+            raise ValueError(f"{url}: max_body_bytes must be a positive integer")
+    for name in ('method', 'mode', 'body_contains'):
+        if name in options and not isinstance(options[name], str):
+            raise ValueError(f"{url}: {name} must be a string")
+    if 'conditional' in options and not isinstance(options['conditional'], bool):
+        raise ValueError(f"{url}: conditional must be true or false")
+    expected = options.get('expected_status')
+    if expected is not None:
+        if not isinstance(expected, list) or not all(
+                isinstance(code, int) and not isinstance(code, bool) and 100 <= code <= 599 for code in expected):
+            raise ValueError(f"{url}: expected_status must be a status code or a list of them")
+    addresses = options.get('addresses')
+    if addresses is not None:
+        if not isinstance(addresses, list) or not all(isinstance(a, str) and a for a in addresses):
+            raise ValueError(f"{url}: addresses must be an address or a list of them")
+
+
+def parse_config(text):
+    """
+    Parse endpoint config TOML into a list of Endpoints.
+
+    Keys in an optional [defaults] table apply to every [[endpoints]] entry
+    that does not set them itself. Raises ValueError on invalid config.
+    """
+    try:
+        data = tomllib.loads(text)
+    except Exception as e:
+        raise ValueError(f"Invalid TOML: {e}") from e
+
+    defaults = data.get('defaults', {})
+    endpoints = []
+    seen = set()
+    for entry in [defaults] + data.get('endpoints', []):
+        unknown = set(entry) - set(ENDPOINT_OPTIONS) - {'url'}
+        if unknown:
+            raise ValueError(f"Unknown endpoint option(s): {', '.join(sorted(unknown))}")
+
+    for entry in data.get('endpoints', []):
+        options = dict(defaults, **entry)
+        url = options.pop('url', None)
+        if not url or not isinstance(url, str):
+            raise ValueError("Endpoint entry without a url")
+        if url in seen:
+            raise ValueError(f"Duplicate endpoint: {url}")
+        seen.add(url)
+        if isinstance(options.get('expected_status'), int):
+            options['expected_status'] = [options['expected_status']]
+        if isinstance(options.get('addresses'), str):
+            options['addresses'] = [options['addresses']]
+        _check_options(url, options)
+        if 'method' in options:
+            options['method'] = options['method'].upper()
+        if 'mode' in options:
+            options['mode'] = options['mode'].lower()
+            if options['mode'] not in PROBE_MODES:
+                raise ValueError(f"{url}: mode must be one of {', '.join(PROBE_MODES)}")
+            if options['mode'] in (MODE_HEAD, MODE_HEADERS) and options.get('body_contains'):
+                raise ValueError(f"{url}: body_contains needs mode 'get' or 'capped'")
+        endpoints.append(Endpoint(url, **options))
+    return endpoints
+
+
+def load_config(path):
+    with open(path, encoding='utf-8') as f:
+        return parse_config(f.read())
+
+
+def _parse_table(text, name, options):
+    """Contents of the optional [name] table, checked against `options`"""
+    try:
+        data = tomllib.loads(text)
+    except Exception as e:
+        raise ValueError(f"Invalid TOML: {e}") from e
+
+    table = data.get(name)
+    if not table:
+        return None
+    unknown = set(table) - set(options)
+    if unknown:
+        raise ValueError(f"Unknown {name} option(s): {', '.join(sorted(unknown))}")
+    return dict(table)
+
+
+def parse_collector(text):
+    """
+    Options of the optional [collector] table as UploadQueue keyword
+    arguments, or None when results are not uploaded. Raises ValueError on
+    invalid config.
+    """
+    options = _parse_table(text, 'collector', COLLECTOR_OPTIONS)
+    if options is None:
+        return None
+    url = options.pop('url', None)
+    if not url:
+        raise ValueError("[collector] without a url")
+    if not isinstance(url, str):
+        raise ValueError("[collector] url must be a string")
+    if 'batch_size' in options and not (
+            isinstance(options['batch_size'], int) and not isinstance(options['batch_size'], bool)
+            and options['batch_size'] > 0):
+        raise ValueError("[collector] batch_size must be a positive integer")
+    if 'max_batch_age' in options and not (_is_number(options['max_batch_age']) and options['max_batch_age'] > 0):
+        raise ValueError("[collector] max_batch_age must be a positive number")
+    options['collector_url'] = url
+    return options
+
+
+def load_collector(path):
+    with open(path, encoding='utf-8') as f:
+        return parse_collector(f.read())
+
+
+def parse_schedule(text):
+    """
+    Options of the optional [schedule] table as create_policy() keyword
+    arguments (empty when absent). Raises ValueError on invalid config.
+    """
+    options = _parse_table(text, 'schedule', SCHEDULE_OPTIONS) or {}
+    if 'window' in options and not (_is_number(options['window']) and options['window'] > 0):
+        raise ValueError("[schedule] window must be a positive number")
+    if 'mode' in options:
+        options['mode'] = str(options['mode']).lower()
+        if options['mode'] not in WAKE_MODES:
+            raise ValueError(f"[schedule] mode must be one of {', '.join(WAKE_MODES)}")
+    return options
+
+
+def load_schedule(path):
+    with open(path, encoding='utf-8') as f:
+        return parse_schedule(f.read())
+
+
+class ConfigWatcher:
+    """Re-reads the config file when its modification time changes"""
+
+    def __init__(self, path):
+        self.path = path
+        self._mtime = None
+
+    def poll(self):
+        """
+        Return the new endpoint list if the file changed since the last
+        poll, otherwise None. A broken file raises ValueError once and is
+        not re-read until it changes again.
+        """
+        try:
+            mtime = os.stat(self.path).st_mtime_ns
+        except FileNotFoundError:
+            return None
+        if mtime == self._mtime:
+            return None
+        self._mtime = mtime
+        return load_config(self.path)
+
+
+def reconcile(scheduler, current, new, tracker=None):
+    """
+    Apply a reloaded endpoint list to a running scheduler.
+
+    Endpoints whose settings did not change keep their existing object, so
+    their schedule, health state and pooled connections carry on untouched.
+    Removed endpoints are unscheduled, changed ones are replaced and probed
+    right away, and new ones are spread over their interval.
+
+    Returns (endpoints, summary), where endpoints is the list now in use.
+    """
+    current_by_url = {e.url: e for e in current}
+    endpoints, added, changed = [], [], []
+    for endpoint in new:
+        old = current_by_url.pop(endpoint.url, None)
+        if old is None:
+            added.append(endpoint)
+        elif old.settings() != endpoint.settings():
+            scheduler.remove(old)
+            changed.append(endpoint)
+        else:
+            endpoints.append(old)
+            continue
+        endpoints.append(endpoint)
+
+    for old in current_by_url.values():
+        scheduler.remove(old)
+        if tracker is not None:
+            tracker.forget(old)
+    for endpoint in changed:
+        scheduler.add(endpoint)
+    scheduler.add_spread(added)
+
+    summary = f"{len(added)} added, {len(changed)} changed, {len(current_by_url)} removed"
+    return endpoints, summary
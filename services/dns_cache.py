@@ -0,0 +1,195 @@
+import socket
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+try:
+    import dns.resolver
+except ImportError:  # declared as a dependency; without it TTLs are not known
+    dns = None
+
+from services.platform_shims import is_android
+
+DEFAULT_TTL = 60
+MIN_TTL = 5
+MAX_TTL = 3600
+NEGATIVE_TTL = 10
+# Fraction of the TTL after which a lookup triggers a background refresh
+REFRESH_AHEAD = 0.8
+
+
+def system_lookup(host):
+    """Addresses for host from the system resolver; TTL unknown (None)"""
+    infos = socket.getaddrinfo(host, None, 0, socket.SOCK_STREAM)
+    return list(dict.fromkeys(info[4][0] for info in infos)), None
+
+
+def android_nameservers():
+    """DNS servers of the active network, from ConnectivityManager via pyjnius"""
+    from jnius import autoclass
+    Context = autoclass('android.content.Context')
+    service = autoclass('org.kivy.android.PythonService').mService
+    manager = service.getSystemService(Context.CONNECTIVITY_SERVICE)
+    properties = manager.getLinkProperties(manager.getActiveNetwork())
+    if properties is None:
+        return []
+    return [address.getHostAddress() for address in properties.getDnsServers().toArray()]
+
+
+_resolver = None
+
+
+def _get_resolver():
+    """
+    dnspython resolver for this device. Android has no resolv.conf, so
+    there the nameservers come from the active network instead.
+    """
+    global _resolver
+    if _resolver is None:
+        if is_android():
+            resolver = dns.resolver.Resolver(configure=False)
+            resolver.nameservers = android_nameservers()
+        else:
+            resolver = dns.resolver.Resolver()
+        _resolver = resolver
+    return _resolver
+
+
+def dnspython_lookup(host):
+    """
+    Addresses for host with their TTL, queried directly with dnspython.
+    Falls back to the system resolver for names dnspython cannot answer
+    (/etc/hosts entries, no usable nameservers, ...).
+    """
+    global _resolver
+    addresses, ttls = [], []
+    for rdtype in ('A', 'AAAA'):
+        try:
+            answer = _get_resolver().resolve(host, rdtype)
+        except dns.resolver.NoAnswer:
+            continue
+        except Exception:
+            # The network, and with it the nameservers, may have changed
+            _resolver = None
+            return system_lookup(host)
+        addresses.extend(rdata.address for rdata in answer)
+        ttls.append(answer.rrset.ttl)
+    if not addresses:
+        return system_lookup(host)
+    return addresses, min(ttls)
+
+
+class _Entry:
+    __slots__ = ('addresses', 'expires', 'refresh_at', 'refreshing')
+
+    def __init__(self, addresses, ttl, now):
+        self.addresses = addresses
+        self.expires = now + ttl
+        self.refresh_at = now + ttl * REFRESH_AHEAD
+        self.refreshing = False
+
+
+class DNSCache:
+    """
+    Caches host name resolution for the probe connections.
+
+    Entries live for the record's TTL, clamped to [min_ttl, max_ttl].
+    TTLs come from dnspython; names it cannot answer, and every name when
+    it is missing, use `default_ttl`. A lookup past REFRESH_AHEAD of the
+    TTL still returns the cached addresses but starts a refresh in the
+    background, so a probe only waits on the resolver when a host is new
+    or its entry expired. If a refresh fails the old addresses are kept
+    until the next attempt.
+    """
+
+    def __init__(self, default_ttl=DEFAULT_TTL, min_ttl=MIN_TTL, max_ttl=MAX_TTL, lookup=None,
+                 clock=time.monotonic):
+        self.default_ttl = default_ttl
+        self.min_ttl = min_ttl
+        self.max_ttl = max_ttl
+        self.lookup = lookup or (dnspython_lookup if dns is not None else system_lookup)
+        self.clock = clock
+        self._entries = {}
+        self._lock = threading.Lock()
+        self._executor = None
+        self._stats = {
+            'hits': 0,
+            'misses': 0,
+            'refreshes': 0,
+            'failures': 0,
+            'resolve_time': 0.0,
+            'max_resolve_time': 0.0,
+        }
+
+    def _ttl(self, ttl):
+        if ttl is None:
+            ttl = self.default_ttl
+        return min(max(ttl, self.min_ttl), self.max_ttl)
+
+    def _lookup(self, host):
+        """Resolve host and store the entry; raises socket.gaierror on failure"""
+        start = time.perf_counter()
+        try:
+            addresses, ttl = self.lookup(host)
+        except Exception:
+            with self._lock:
+                self._stats['failures'] += 1
+            raise
+        finally:
+            elapsed = time.perf_counter() - start
+            with self._lock:
+                self._stats['resolve_time'] += elapsed
+                self._stats['max_resolve_time'] = max(self._stats['max_resolve_time'], elapsed)
+        with self._lock:
+            self._entries[host] = _Entry(addresses, self._ttl(ttl), self.clock())
+        return addresses
+
+    def _refresh(self, host):
+        try:
+            self._lookup(host)
+        except Exception:
+            # Keep serving the old addresses; retry after a short delay
+            with self._lock:
+                entry = self._entries.get(host)
+                if entry is not None:
+                    entry.refreshing = False
+                    entry.refresh_at = self.clock() + NEGATIVE_TTL
+
+    def resolve(self, host, port=None):
+        """Addresses to try for host, in order"""
+        now = self.clock()
+        with self._lock:
+            entry = self._entries.get(host)
+            if entry is not None and now < entry.expires:
+                self._stats['hits'] += 1
+                if now >= entry.refresh_at and not entry.refreshing:
+                    entry.refreshing = True
+                    self._stats['refreshes'] += 1
+                    if self._executor is None:
+                        self._executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix='dns-refresh')
+                    self._executor.submit(self._refresh, host)
+                return list(entry.addresses)
+            self._stats['misses'] += 1
+        try:
+            return list(self._lookup(host))
+        except Exception as e:
+            with self._lock:
+                stale = self._entries.get(host)
+            if stale is not None:
+                # Better to try a stale address than to fail the probe on DNS
+                return list(stale.addresses)
+            if isinstance(e, socket.gaierror):
+                raise
+            raise socket.gaierror(socket.EAI_NONAME, str(e)) from e
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats['entries'] = len(self._entries)
+        lookups = stats['hits'] + stats['misses']
+        stats['hit_rate'] = stats['hits'] / lookups if lookups else 0.0
+        return stats
+
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
@@ -0,0 +1,82 @@
+UP = 'up'
+DEGRADED = 'degraded'
+DOWN = 'down'
+
+DEFAULT_DOWN_AFTER = 3
+DEFAULT_RETRY_INTERVAL = 10
+DEFAULT_MAX_BACKOFF = 10 * 60
+
+
+class Transition:
+    """An endpoint moving from one state to another"""
+
+    def __init__(self, endpoint, old, new, failures):
+        self.endpoint = endpoint
+        self.old = old
+        self.new = new
+        self.failures = failures
+
+
+class _Health:
+    def __init__(self):
+        self.state = None
+        self.failures = 0
+
+
+class HealthTracker:
+    """
+    Up/degraded/down state machine per endpoint.
+
+    One failure marks an endpoint degraded and it is re-checked after
+    `retry_interval` seconds; `down_after` consecutive failures mark it
+    down. Down endpoints are probed with an exponential backoff from their
+    normal interval, capped at `max_backoff` (or at the normal interval,
+    if that is longer), and a single success brings
+    them straight back to up and their normal cadence. observe() only
+    returns a Transition when the state actually changes, so callers can log
+    and alert on transitions alone.
+    """
+
+    def __init__(self, down_after=DEFAULT_DOWN_AFTER, retry_interval=DEFAULT_RETRY_INTERVAL, max_backoff=DEFAULT_MAX_BACKOFF):
+        self.down_after = down_after
+        self.retry_interval = retry_interval
+        self.max_backoff = max_backoff
+        self._health = {}
+
+    def state(self, endpoint):
+        health = self._health.get(endpoint.url)
+        return health.state if health else None
+
+    def observe(self, result):
+        """Feed a ProbeResult in; returns a Transition or None"""
+        health = self._health.get(result.endpoint.url)
+        if health is None:
+            health = self._health[result.endpoint.url] = _Health()
+        old = health.state
+        failures = health.failures
+
+        if result.ok:
+            health.failures = 0
+            health.state = UP
+        else:
+            health.failures += 1
+            health.state = DOWN if health.failures >= self.down_after else DEGRADED
+            failures = health.failures
+
+        if health.state == old:
+            return None
+        return Transition(result.endpoint, old, health.state, failures)
+
+    def interval_for(self, endpoint):
+        """Seconds until the next probe of `endpoint`, given its state"""
+        health = self._health.get(endpoint.url)
+        if health is None or health.state in (None, UP):
+            return endpoint.interval
+        if health.state == DEGRADED:
+            return min(self.retry_interval, endpoint.interval)
+        exponent = min(health.failures - self.down_after + 1, 16)
+        # Never probe a down endpoint more often than a healthy one
+        return min(endpoint.interval * 2 ** exponent, max(self.max_backoff, endpoint.interval))
+
+    def forget(self, endpoint):
+        self._health.pop(endpoint.url, None)
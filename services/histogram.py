@@ -0,0 +1,78 @@
+import math
+
+DEFAULT_PRECISION = 0.02
+# Latencies are tracked in milliseconds; anything outside this range is
+# clamped, which is what keeps the number of buckets bounded
+MIN_LATENCY_MS = 0.1
+MAX_LATENCY_MS = 10 * 60 * 1000.0
+
+
+class LatencyHistogram:
+    """
+    Streaming latency histogram with bounded memory.
+
+    Values fall into logarithmic buckets, so every percentile is accurate to
+    within `precision` relative error. Memory depends only on the clamp
+    range and precision (a few hundred buckets at most), never on how many
+    values were recorded. Histograms with the same precision can be merged,
+    which is how minute buckets roll up into hours.
+    """
+
+    def __init__(self, precision=DEFAULT_PRECISION):
+        self.precision = precision
+        self._gamma = (1 + precision) / (1 - precision)
+        self._log_gamma = math.log(self._gamma)
+        self._buckets = {}
+        self.count = 0
+        self.total = 0.0
+        self.min = None
+        self.max = None
+
+    def __len__(self):
+        return self.count
+
+    def record(self, value_ms, count=1):
+        value_ms = min(max(value_ms, MIN_LATENCY_MS), MAX_LATENCY_MS)
+        index = math.ceil(math.log(value_ms) / self._log_gamma)
+        self._buckets[index] = self._buckets.get(index, 0) + count
+        self.count += count
+        self.total += value_ms * count
+        self.min = value_ms if self.min is None else min(self.min, value_ms)
+        self.max = value_ms if self.max is None else max(self.max, value_ms)
+
+    def merge(self, other):
+        if other.precision != self.precision:
+            raise ValueError("Cannot merge histograms with different precision")
+        for index, count in other._buckets.items():
+            self._buckets[index] = self._buckets.get(index, 0) + count
+        self.count += other.count
+        self.total += other.total
+        if other.count:
+            self.min = other.min if self.min is None else min(self.min, other.min)
+            self.max = other.max if self.max is None else max(self.max, other.max)
+
+    def percentile(self, q):
+        """Latency in ms at percentile `q` (0-100), or None when empty"""
+        if not self.count:
+            return None
+        rank = q / 100.0 * (self.count - 1)
+        seen = 0
+        for index in sorted(self._buckets):
+            seen += self._buckets[index]
+            if seen > rank:
+                value = 2 * self._gamma ** index / (self._gamma + 1)
+                return min(max(value, self.min), self.max)
+        return self.max
+
+    def percentiles(self, qs=(50, 95, 99)):
+        return {q: self.percentile(q) for q in qs}
+
+    def mean(self):
+        return self.total / self.count if self.count else None
+
+    def clear(self):
+        self._buckets.clear()
+        self.count = 0
+        self.total = 0.0
+        self.min = None
+        self.max = None
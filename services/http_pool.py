@@ -0,0 +1,260 @@
+import socket
+import threading
+import time
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+from urllib3.exceptions import ConnectTimeoutError, NewConnectionError
+
+from services.dns_cache import DNSCache
+
+try:
+    from urllib3.exceptions import NameResolutionError
+except ImportError:  # urllib3 < 2
+    NameResolutionError = None
+
+DEFAULT_POOL_SIZE = 4
+DEFAULT_IDLE_TIMEOUT = 300
+
+# Timings of the request running on the current thread. Connections are
+# opened on the same worker thread that issues the request, so the
+# connection classes below can report back without any extra plumbing.
+# The same thread-local carries the resolver the request should use.
+_timings = threading.local()
+
+
+class RequestTimings:
+    """
+    Phase breakdown of one request, in seconds.
+
+    dns, connect and tls are 0 when a pooled connection was reused. ttfb
+    runs from the start of the request to the response headers and
+    includes any handshakes; server is ttfb minus those handshakes.
+    """
+    __slots__ = ('dns', 'connect', 'tls', 'ttfb', 'total')
+
+    def __init__(self):
+        self.dns = 0.0
+        self.connect = 0.0
+        self.tls = 0.0
+        self.ttfb = 0.0
+        self.total = 0.0
+
+    @property
+    def handshake(self):
+        return self.dns + self.connect + self.tls
+
+    @property
+    def server(self):
+        return max(self.ttfb - self.handshake, 0.0)
+
+    def as_dict(self):
+        return {
+            'dns': self.dns,
+            'connect': self.connect,
+            'tls': self.tls,
+            'ttfb': self.ttfb,
+            'server': self.server,
+            'total': self.total,
+        }
+
+
+def _current_timings():
+    timings = getattr(_timings, 'current', None)
+    if timings is None:
+        # A connection opened outside SessionPool.request; time into a scratch object
+        timings = _timings.current = RequestTimings()
+    return timings
+
+
+def resolve(host, port):
+    """Resolve host to a list of addresses to try, in order"""
+    infos = socket.getaddrinfo(host, port, 0, socket.SOCK_STREAM)
+    return list(dict.fromkeys(info[4][0] for info in infos))
+
+
+class _TimedConnectionMixin:
+    """
+    Splits connection setup into DNS and TCP connect phases.
+
+    The host is resolved here rather than inside urllib3, so resolution is
+    timed on its own; each resolved address is then tried in turn. The
+    HTTPS class additionally times the TLS handshake.
+    """
+
+    def _new_conn(self):
+        timings = _current_timings()
+        host = self._dns_host
+        resolver = getattr(_timings, 'resolve', None) or resolve
+        start = time.perf_counter()
+        try:
+            addresses = resolver(host, self.port)
+        except socket.gaierror as e:
+            if NameResolutionError is not None:
+                raise NameResolutionError(self.host, self, e) from e
+            raise NewConnectionError(self, f"Failed to resolve '{self.host}' ({e})") from e
+        finally:
+            timings.dns += time.perf_counter() - start
+
+        start = time.perf_counter()
+        try:
+            error = None
+            for address in addresses:
+                self._dns_host = address
+                try:
+                    return super()._new_conn()
+                except (NewConnectionError, ConnectTimeoutError) as e:
+                    error = e
+            raise error
+        finally:
+            self._dns_host = host
+            timings.connect += time.perf_counter() - start
+
+
+class TimedHTTPConnection(_TimedConnectionMixin, HTTPConnection):
+    pass
+
+
+class TimedHTTPSConnection(_TimedConnectionMixin, HTTPSConnection):
+    def connect(self):
+        timings = _current_timings()
+        before = timings.dns + timings.connect
+        start = time.perf_counter()
+        try:
+            super().connect()
+        finally:
+            elapsed = time.perf_counter() - start
+            # Whatever connect() spent beyond DNS and TCP is the TLS handshake
+            timings.tls += max(elapsed - (timings.dns + timings.connect - before), 0.0)
+
+
+class TimedHTTPConnectionPool(HTTPConnectionPool):
+    ConnectionCls = TimedHTTPConnection
+
+
+class TimedHTTPSConnectionPool(HTTPSConnectionPool):
+    ConnectionCls = TimedHTTPSConnection
+
+
+class TimedHTTPAdapter(HTTPAdapter):
+    """HTTPAdapter whose connections report how long each setup phase took"""
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            'http': TimedHTTPConnectionPool,
+            'https': TimedHTTPSConnectionPool,
+        }
+
+
+class SessionPool:
+    """
+    Keep-alive HTTP sessions, one per host, shared by every probe.
+
+    Connections to a host are reused across probe cycles so TCP and TLS
+    handshakes only happen when a connection is new or was dropped.
+    Sessions that have not been used for `idle_timeout` seconds are closed.
+
+    Host names are resolved through `resolver` (a DNSCache by default).
+    Requests given `addresses` connect to those instead of resolving, over
+    a session of their own.
+
+    HTTP/2 is not available through requests, so connections stay on
+    HTTP/1.1 keep-alive.
+    """
+
+    def __init__(self, pool_size=DEFAULT_POOL_SIZE, idle_timeout=DEFAULT_IDLE_TIMEOUT, resolver=None):
+        self.pool_size = pool_size
+        self.idle_timeout = idle_timeout
+        self.resolver = resolver or DNSCache()
+        self._sessions = {}
+        self._last_used = {}
+        self._lock = threading.Lock()
+        self._stats = {
+            'requests': 0,
+            'handshakes': 0,
+            'handshake_time': 0.0,
+            'request_time': 0.0,
+            'evicted': 0,
+        }
+
+    def _session_for(self, url, addresses=None):
+        parts = urlsplit(url)
+        host = (parts.scheme, parts.netloc, addresses)
+        with self._lock:
+            session = self._sessions.get(host)
+            if session is None:
+                session = requests.Session()
+                adapter = TimedHTTPAdapter(pool_connections=1, pool_maxsize=self.pool_size)
+                session.mount('http://', adapter)
+                session.mount('https://', adapter)
+                self._sessions[host] = session
+            self._last_used[host] = time.monotonic()
+            return session
+
+    def request(self, method, url, stream=False, addresses=None, **kwargs):
+        """
+        Send a request over a pooled connection.
+
+        Returns (response, timings) where timings is a RequestTimings. Unless
+        `stream` is set the body is read before returning, so timings.total
+        covers the whole transfer. `addresses` overrides DNS for this request.
+        """
+        if addresses:
+            addresses = tuple(addresses)
+            _timings.resolve = lambda host, port: list(addresses)
+        else:
+            addresses = None
+            _timings.resolve = self.resolver.resolve
+        session = self._session_for(url, addresses)
+        timings = _timings.current = RequestTimings()
+        start = time.perf_counter()
+        try:
+            response = session.request(method, url, stream=True, **kwargs)
+            timings.ttfb = time.perf_counter() - start
+            if not stream:
+                response.content
+        finally:
+            _timings.current = None
+            _timings.resolve = None
+            timings.total = time.perf_counter() - start
+            handshake = timings.handshake
+            with self._lock:
+                self._stats['requests'] += 1
+                self._stats['handshake_time'] += handshake
+                self._stats['request_time'] += timings.total - handshake
+                if handshake:
+                    self._stats['handshakes'] += 1
+        return response, timings
+
+    def evict_idle(self, now=None):
+        """Close sessions for hosts that have been idle longer than idle_timeout"""
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            idle = [
+                host for host, last_used in self._last_used.items()
+                if now - last_used > self.idle_timeout
+            ]
+            for host in idle:
+                self._sessions.pop(host).close()
+                del self._last_used[host]
+            self._stats['evicted'] += len(idle)
+        return len(idle)
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats['hosts'] = len(self._sessions)
+        stats['dns'] = self.resolver.stats()
+        return stats
+
+    def close(self):
+        with self._lock:
+            for session in self._sessions.values():
+                session.close()
+            self._sessions.clear()
+            self._last_used.clear()
+        self.resolver.close()
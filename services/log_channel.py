@@ -0,0 +1,179 @@
+import os
+import socket
+import struct
+import threading
+
+DEFAULT_MAX_BYTES = 256 * 1024
+NOTIFY_HOST = '127.0.0.1'
+NOTIFY_PORT = 48923
+# Every record is preceded by its length, so records can hold any bytes
+FRAME = struct.Struct('<I')
+
+
+class LogWriter:
+    """
+    Append-only record log shared between the service and the UI.
+
+    Records are length-prefixed and only ever appended; the file is kept
+    open between writes. Once it grows past `max_bytes` it is rotated to
+    `<path>.1` and a fresh file is started, so the log stays bounded without
+    anyone having to truncate it. If a `notifier` is given it is poked after
+    every append so readers can wake up instead of polling.
+    """
+
+    def __init__(self, path, max_bytes=DEFAULT_MAX_BYTES, notifier=None):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.notifier = notifier
+        self._lock = threading.Lock()
+        self._file = None
+
+    def _open(self):
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        self._file = open(self.path, 'ab')
+
+    def append(self, record):
+        """Append one record (bytes)"""
+        self.append_many([record])
+
+    def append_many(self, records):
+        """Append a batch of records with a single write and one notification"""
+        with self._lock:
+            if self._file is None:
+                self._open()
+            self._file.write(b''.join(FRAME.pack(len(record)) + record for record in records))
+            self._file.flush()
+            if self._file.tell() >= self.max_bytes:
+                self._rotate()
+        if self.notifier is not None:
+            self.notifier.notify()
+
+    def _rotate(self):
+        self._file.close()
+        os.replace(self.path, self.path + '.1')
+        self._open()
+
+    def close(self):
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+
+class LogReader:
+    """
+    Cursor over a LogWriter file.
+
+    Each call to read_new() returns only the complete records appended since
+    the previous call. The file is never modified by the reader. Rotation is
+    detected by inode, and whatever was left unread in the rotated file is
+    drained before moving on to the new one.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._file = None
+        self._partial = b''
+
+    def _open(self):
+        try:
+            self._file = open(self.path, 'rb')
+        except FileNotFoundError:
+            self._file = None
+        self._partial = b''
+
+    def _rotated(self):
+        try:
+            return os.stat(self.path).st_ino != os.fstat(self._file.fileno()).st_ino
+        except FileNotFoundError:
+            return False
+
+    def _drain(self, records):
+        data = self._partial + self._file.read()
+        offset = 0
+        while len(data) - offset >= FRAME.size:
+            length, = FRAME.unpack_from(data, offset)
+            end = offset + FRAME.size + length
+            if end > len(data):
+                break
+            records.append(data[offset + FRAME.size:end])
+            offset = end
+        # Whatever is left is a record still being written
+        self._partial = data[offset:]
+
+    def read_new(self):
+        """Return the records written since the last call, oldest first"""
+        records = []
+        if self._file is None:
+            self._open()
+            if self._file is None:
+                return records
+
+        self._drain(records)
+        if self._rotated():
+            # Pick up anything written to the old file just before rotation
+            self._drain(records)
+            self._file.close()
+            self._open()
+            if self._file is not None:
+                self._drain(records)
+        return records
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+class ChangeNotifier:
+    """
+    Wakes a ChangeListener in another process with a loopback UDP datagram.
+
+    Sending never blocks and never fails loudly: if nobody is listening the
+    datagram is simply dropped, and the reader catches up from its cursor
+    the next time it is woken.
+    """
+
+    def __init__(self, port=NOTIFY_PORT):
+        self.address = (NOTIFY_HOST, port)
+        self._sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self._sock.setblocking(False)
+
+    def notify(self):
+        try:
+            self._sock.sendto(b'1', self.address)
+        except OSError:
+            pass
+
+    def close(self):
+        self._sock.close()
+
+
+class ChangeListener:
+    """Blocks until a ChangeNotifier signals new records; costs nothing while idle"""
+
+    def __init__(self, port=NOTIFY_PORT):
+        self._sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self._sock.bind((NOTIFY_HOST, port))
+
+    def wait(self, timeout=None):
+        """
+        Wait for at least one notification and swallow any others queued
+        behind it, so a burst of appends results in a single wake-up.
+        Returns False if `timeout` expired first.
+        """
+        self._sock.settimeout(timeout)
+        try:
+            self._sock.recv(16)
+        except socket.timeout:
+            return False
+        self._sock.setblocking(False)
+        try:
+            while True:
+                self._sock.recv(16)
+        except (BlockingIOError, InterruptedError):
+            pass
+        return True
+
+    def close(self):
+        self._sock.close()
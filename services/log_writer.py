@@ -0,0 +1,103 @@
+import atexit
+import os
+import threading
+import time
+
+DEFAULT_FLUSH_INTERVAL = 1.0
+DEFAULT_MAX_PENDING = 256
+
+
+class BatchWriter:
+    """
+    Buffers log records in memory and writes them in batches from a
+    background thread.
+
+    A batch goes out `flush_interval` seconds after the first pending record
+    arrives, or as soon as `max_pending` records are waiting. Callers never
+    touch the filesystem, and the thread sleeps without waking up while
+    nothing is pending. Pending records are flushed at interpreter exit.
+    """
+
+    def __init__(self, write_batch, flush_interval=DEFAULT_FLUSH_INTERVAL, max_pending=DEFAULT_MAX_PENDING):
+        self._write_batch = write_batch
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self._pending = []
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._has_pending = threading.Event()
+        self._full = threading.Event()
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name='log-writer', daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def write(self, record):
+        with self._lock:
+            self._pending.append(record)
+            pending = len(self._pending)
+        if pending == 1:
+            self._has_pending.set()
+        if pending >= self.max_pending:
+            self._full.set()
+
+    def _run(self):
+        while not self._closed:
+            self._has_pending.wait()
+            self._full.wait(self.flush_interval)
+            self._full.clear()
+            self.flush()
+
+    def flush(self):
+        with self._flush_lock:
+            with self._lock:
+                batch, self._pending = self._pending, []
+                self._has_pending.clear()
+            if batch:
+                try:
+                    self._write_batch(batch)
+                except Exception as e:
+                    print(f"Error flushing log batch: {e}")
+
+    def close(self):
+        if self._closed:
+            return
+        self._closed = True
+        self._has_pending.set()
+        self._full.set()
+        self._thread.join(timeout=5)
+        self.flush()
+
+
+class LineFile:
+    """
+    Text file that batches of lines are appended to.
+
+    The file is opened once and kept open. With `fsync_interval` None the
+    data is left to the OS page cache; 0 fsyncs after every batch; any
+    other value fsyncs at most once per that many seconds.
+    """
+
+    def __init__(self, path, fsync_interval=None, clock=time.monotonic):
+        self.path = path
+        self.fsync_interval = fsync_interval
+        self._file = None
+        self._last_sync = 0.0
+        self._clock = clock
+
+    def write_batch(self, lines):
+        if self._file is None:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            self._file = open(self.path, 'a')
+        self._file.write(''.join(lines))
+        self._file.flush()
+        if self.fsync_interval is not None:
+            now = self._clock()
+            if now - self._last_sync >= self.fsync_interval:
+                os.fsync(self._file.fileno())
+                self._last_sync = now
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
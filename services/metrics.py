@@ -0,0 +1,76 @@
+import json
+import os
+import threading
+
+from services.histogram import LatencyHistogram
+
+PHASES = ('dns', 'connect', 'tls', 'ttfb', 'server', 'total')
+HANDSHAKE_PHASES = ('dns', 'connect', 'tls')
+
+
+class ProbeMetrics:
+    """
+    Per-endpoint latency histograms for every probe phase.
+
+    Handshake phases are only recorded for probes that opened a new
+    connection, so reused connections do not drag DNS/connect/TLS
+    percentiles towards zero. Comparing `server` (time to first byte minus
+    handshakes) with the handshake phases separates a slow cold start of
+    the monitored app from network trouble. Memory per endpoint is bounded
+    by the histograms, however long the service runs.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._histograms = {}
+
+    def record(self, result):
+        timings = result.timings
+        if timings is None:
+            return
+        values = timings.as_dict()
+        with self._lock:
+            histograms = self._histograms.get(result.endpoint.url)
+            if histograms is None:
+                histograms = self._histograms[result.endpoint.url] = {
+                    phase: LatencyHistogram() for phase in PHASES
+                }
+            for phase in PHASES:
+                if phase in HANDSHAKE_PHASES and not timings.handshake:
+                    continue
+                if phase == 'tls' and not timings.tls:
+                    # Plain HTTP endpoint
+                    continue
+                histograms[phase].record(values[phase] * 1000)
+
+    def percentiles(self, url, qs=(50, 95, 99)):
+        """{phase: {q: ms}} for one endpoint"""
+        with self._lock:
+            histograms = self._histograms.get(url, {})
+            return {phase: h.percentiles(qs) for phase, h in histograms.items()}
+
+    def merged(self, phase):
+        """Histogram of one phase across every endpoint"""
+        merged = LatencyHistogram()
+        with self._lock:
+            for histograms in self._histograms.values():
+                merged.merge(histograms[phase])
+        return merged
+
+    def snapshot(self):
+        with self._lock:
+            urls = list(self._histograms)
+        return {
+            url: {
+                phase: dict(p, count=len(self._histograms[url][phase]))
+                for phase, p in self.percentiles(url).items()
+            }
+            for url in urls
+        }
+
+    def write_snapshot(self, path):
+        """Atomically write the current percentiles as JSON for other processes"""
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(self.snapshot(), f)
+        os.replace(tmp_path, path)
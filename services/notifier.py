@@ -0,0 +1,147 @@
+import threading
+import time
+
+NOTIFICATION_ID = 1
+CHANNEL_ID = 'default'
+CHANNEL_NAME = 'Default Channel'
+CHANNEL_DESCRIPTION = 'Default notifications channel'
+DEFAULT_COALESCE_WINDOW = 5.0
+
+ALERT_TEXT = {
+    'down': ('endpoint down', 'endpoints down'),
+    'degraded': ('endpoint degraded', 'endpoints degraded'),
+    'up': ('endpoint recovered', 'endpoints recovered'),
+}
+
+
+class Notifier:
+    """
+    Android notifications through one persistent, updatable notification.
+
+    The Java classes, notification channel, content intent and builder are
+    resolved once on first use and reused for every update. Endpoint alerts
+    raised within `coalesce_window` seconds of each other are merged into a
+    single update such as "5 endpoints down".
+    """
+
+    def __init__(self, coalesce_window=DEFAULT_COALESCE_WINDOW):
+        self.coalesce_window = coalesce_window
+        self._lock = threading.Lock()
+        self._pending = {}
+        self._timer = None
+        self._builder = None
+        self._manager = None
+        self._String = None
+
+    def _resolve(self):
+        """Look up the JNI classes and register the channel, once"""
+        if self._builder is not None:
+            return
+        from jnius import autoclass, cast
+
+        PythonActivity = autoclass('org.kivy.android.PythonActivity')
+        NotificationBuilder = autoclass('android.app.Notification$Builder')
+        NotificationManager = autoclass('android.app.NotificationManager')
+        NotificationChannel = autoclass('android.app.NotificationChannel')
+        Context = autoclass('android.content.Context')
+        Intent = autoclass('android.content.Intent')
+        PendingIntent = autoclass('android.app.PendingIntent')
+        String = autoclass('java.lang.String')
+
+        context = cast('android.content.Context', PythonActivity.mActivity)
+
+        # Create notification channel (required for Android 8.0 and above)
+        channel_id = String(CHANNEL_ID)
+        channel = NotificationChannel(
+            channel_id,
+            String(CHANNEL_NAME),
+            NotificationManager.IMPORTANCE_DEFAULT
+        )
+        channel.setDescription(String(CHANNEL_DESCRIPTION))
+        manager = cast(
+            'android.app.NotificationManager',
+            context.getSystemService(Context.NOTIFICATION_SERVICE)
+        )
+        manager.createNotificationChannel(channel)
+
+        intent = Intent(context, PythonActivity)
+        intent.setFlags(Intent.FLAG_ACTIVITY_NEW_TASK | Intent.FLAG_ACTIVITY_CLEAR_TASK)
+        pending_intent = PendingIntent.getActivity(
+            context,
+            0,
+            intent,
+            PendingIntent.FLAG_IMMUTABLE
+        )
+
+        builder = NotificationBuilder(context, channel_id)
+        builder.setSmallIcon(context.getApplicationInfo().icon)
+        builder.setAutoCancel(True)
+        builder.setContentIntent(pending_intent)
+
+        self._String = String
+        self._manager = manager
+        self._builder = builder
+
+    def post(self, title, message):
+        """Show `title`/`message`, replacing whatever the notification showed before"""
+        try:
+            with self._lock:
+                self._resolve()
+                self._builder.setContentTitle(self._String(title))
+                self._builder.setContentText(self._String(message))
+                self._manager.notify(NOTIFICATION_ID, self._builder.build())
+        except Exception as e:
+            print(f"Error sending notification: {e}")
+
+    def alert(self, kind, url):
+        """
+        Queue an endpoint alert (`kind` is 'down', 'degraded' or 'up').
+        Alerts are posted together once the coalesce window has passed.
+        """
+        with self._lock:
+            # A later alert for the same endpoint supersedes an earlier one
+            for urls in self._pending.values():
+                urls.pop(url, None)
+            self._pending.setdefault(kind, {})[url] = time.time()
+            if self._timer is None:
+                self._timer = threading.Timer(self.coalesce_window, self._flush_on_timer)
+                self._timer.daemon = True
+                self._timer.start()
+
+    def _flush_on_timer(self):
+        try:
+            self.flush()
+        finally:
+            # Timer overrides run(), so pyjnius' hook that detaches Python
+            # threads from the JVM never runs; Android aborts the process
+            # if a thread exits still attached
+            try:
+                from jnius import detach
+            except ImportError:
+                return
+            detach()
+
+    def flush(self):
+        with self._lock:
+            pending, self._pending = self._pending, {}
+            self._timer = None
+        counts = [(kind, list(urls)) for kind, urls in pending.items() if urls]
+        if not counts:
+            return
+        if len(counts) == 1 and len(counts[0][1]) == 1:
+            kind, (url,) = counts[0]
+            self.post(f"1 {ALERT_TEXT[kind][0]}", url)
+            return
+        summary = []
+        for kind, urls in counts:
+            singular, plural = ALERT_TEXT[kind]
+            summary.append(f"{len(urls)} {singular if len(urls) == 1 else plural}")
+        urls = [url for _, kind_urls in counts for url in kind_urls]
+        self.post(", ".join(summary), ", ".join(urls))
+
+
+class ConsoleNotifier(Notifier):
+    """Notifier for headless runs: same coalescing, printed to stdout"""
+
+    def post(self, title, message):
+        print(f"[notification] {title}: {message}", flush=True)
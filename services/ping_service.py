@@ -1,50 +1,60 @@
 import sys
+import argparse
 import traceback
 from datetime import datetime, timezone
 import time
-import requests
 import os
-import json
-import random
-from jnius import autoclass, cast
-from plyer import notification
+import shutil
+from services import records
+from services.notifier import Notifier, ConsoleNotifier
+from services.log_channel import LogWriter, ChangeNotifier
+from services.log_writer import BatchWriter, LineFile
+from services.platform_shims import is_android, is_service_process, set_data_dir, get_data_dir, enable_auto_restart
 
-def get_android_external_files_dir():
-    """Get the Android external files directory path"""
-    try:
-        PythonActivity = autoclass('org.kivy.android.PythonActivity')
-        activity = PythonActivity.mActivity
-        context = cast('android.content.Context', activity)
-        return context.getExternalFilesDir(None).getAbsolutePath()
-    except:
-        return None
+# The probe engine and its dependencies (requests, urllib3, ...) are imported
+# in main(), after the service has announced itself
+
+# Headless runs also print service log lines to stdout
+_echo = False
 
 def get_log_file_path(filename):
     """Get the appropriate log file path based on platform"""
     try:
-        external_dir = get_android_external_files_dir()
-        if external_dir:
-            # We're on Android
-            return os.path.join(external_dir, filename)
-        else:
-            # We're on desktop/development environment
-            return os.path.join(os.path.dirname(__file__), filename)
+        return os.path.join(get_data_dir(), filename)
     except Exception as e:
         print(f"Error getting log file path: {e}")
         return None
 
+_debug_log = None
+
+def get_debug_log():
+    """Return the buffered writer for service_debug.log, creating it on first use"""
+    global _debug_log
+    if _debug_log is None:
+        debug_file = get_log_file_path('service_debug.log')
+        if debug_file:
+            _debug_log = BatchWriter(LineFile(debug_file).write_batch)
+    return _debug_log
+
 def log_to_file(message):
     """Helper function to log messages to a debug file"""
     try:
-        debug_file = get_log_file_path('service_debug.log')
-        if debug_file:
-            os.makedirs(os.path.dirname(debug_file), exist_ok=True)
-            with open(debug_file, 'a') as f:
-                timestamp = datetime.now(timezone.utc).strftime("%Y-%m-%d %H:%M:%S")
-                f.write(f"[{timestamp}] {message}\n")
+        debug_log = get_debug_log()
+        if debug_log:
+            timestamp = datetime.now(timezone.utc).strftime("%Y-%m-%d %H:%M:%S")
+            debug_log.write(f"[{timestamp}] {message}\n")
     except Exception as e:
         print(f"Service debug log error: {e}")
 
+_notifier = None
+
+def get_notifier():
+    """Return the shared Notifier; its JNI lookups happen once on first use"""
+    global _notifier
+    if _notifier is None:
+        _notifier = Notifier() if is_android() else ConsoleNotifier()
+    return _notifier
+
 def send_android_notification(title, message):
     """
     Send an Android notification using standard Android API
@@ -53,100 +63,83 @@ def send_android_notification(title, message):
         title (str): Title of the notification
         message (str): Content of the notification
     """
-    try:
-        # Import required Android classes
-        PythonActivity = autoclass('org.kivy.android.PythonActivity')
-        NotificationBuilder = autoclass('android.app.Notification$Builder')
-        NotificationManager = autoclass('android.app.NotificationManager')
-        NotificationChannel = autoclass('android.app.NotificationChannel')
-        Context = autoclass('android.content.Context')
-        Intent = autoclass('android.content.Intent')
-        PendingIntent = autoclass('android.app.PendingIntent')
-        String = autoclass('java.lang.String')
-        
-        # Get the current activity and context
-        activity = PythonActivity.mActivity
-        context = cast('android.content.Context', activity)
-        
-        # Create notification channel (required for Android 8.0 and above)
-        channel_id = String('default')
-        channel_name = String('Default Channel')
-        channel_description = String('Default notifications channel')
-        importance = NotificationManager.IMPORTANCE_DEFAULT
-        
-        channel = NotificationChannel(channel_id, channel_name, importance)
-        channel.setDescription(channel_description)
-        
-        # Get the notification manager and create the channel
-        notification_manager = cast(
-            'android.app.NotificationManager',
-            context.getSystemService(Context.NOTIFICATION_SERVICE)
-        )
-        notification_manager.createNotificationChannel(channel)
-        
-        # Create an intent
-        intent = Intent(context, PythonActivity)
-        intent.setFlags(Intent.FLAG_ACTIVITY_NEW_TASK | Intent.FLAG_ACTIVITY_CLEAR_TASK)
-        
-        # Create a PendingIntent with FLAG_IMMUTABLE
-        pending_intent = PendingIntent.getActivity(
-            context,
-            0,
-            intent,
-            PendingIntent.FLAG_IMMUTABLE
-        )
-        
-        # Build the notification
-        notification_builder = NotificationBuilder(context, channel_id)
-        notification_builder.setContentTitle(String(title))
-        notification_builder.setContentText(String(message))
-        notification_builder.setSmallIcon(context.getApplicationInfo().icon)
-        notification_builder.setAutoCancel(True)
-        notification_builder.setContentIntent(pending_intent)
-        
-        # Show the notification
-        notification_manager.notify(1, notification_builder.build())
-        
-    except Exception as e:
-        print(f"Error sending notification: {e}")
+    get_notifier().post(title, message)
 
 def get_formatted_time():
     """Returns current time in UTC format YYYY-MM-DD HH:MM:SS"""
     return datetime.now(timezone.utc).strftime('%Y-%m-%d %H:%M:%S')
 
-def log_message(message, success=True):
-    """Write log message to a file that the main app can read"""
+def get_config_path():
+    """
+    Path of the endpoint config the service watches. On first run the
+    bundled endpoints.toml is copied next to the logs so it can be edited.
+    """
+    bundled = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'endpoints.toml')
+    config_file = get_log_file_path('endpoints.toml')
+    if not config_file:
+        return bundled
+    if not os.path.exists(config_file) and os.path.exists(bundled):
+        os.makedirs(os.path.dirname(config_file), exist_ok=True)
+        shutil.copyfile(bundled, config_file)
+    return config_file
+
+_service_log = None
+
+def get_service_log():
+    """Return the buffered writer for service_logs.bin, opening it on first use"""
+    global _service_log
+    if _service_log is None:
+        log_file = get_log_file_path('service_logs.bin')
+        if log_file:
+            writer = LogWriter(log_file, notifier=ChangeNotifier())
+            # Short interval: the UI is waiting on these records
+            _service_log = BatchWriter(writer.append_many, flush_interval=0.1)
+    return _service_log
+
+_probe_log = None
+
+def get_probe_log():
+    """Return the buffered writer for probe_results.bin, the dashboard's feed"""
+    global _probe_log
+    if _probe_log is None:
+        log_file = get_log_file_path('probe_results.bin')
+        if log_file:
+            writer = LogWriter(log_file, notifier=ChangeNotifier())
+            _probe_log = BatchWriter(writer.append_many, flush_interval=0.5)
+    return _probe_log
+
+def log_probe(result, state):
+    """Write one compact record per probe for the UI dashboard"""
     try:
-        timestamp = get_formatted_time()
-        log_entry = {
-            'timestamp': timestamp,
-            'message': message,
-            'success': success
-        }
-        
-        # Get the service logs file path
-        log_file = get_log_file_path('service_logs.json')
-        
-        if not log_file:
+        probe_log = get_probe_log()
+        if probe_log:
+            probe_log.write(records.encode(records.probe_record(result, state)))
+    except Exception as e:
+        print(f"Error writing probe record: {e}")
+
+def log_record(record):
+    """Write a records.Record to the log the main app reads"""
+    try:
+        service_log = get_service_log()
+        if not service_log:
             print("Error: Could not determine log file path")
             return
-            
-        # Ensure directory exists
-        os.makedirs(os.path.dirname(log_file), exist_ok=True)
         
-        with open(log_file, 'a') as f:
-            f.write(json.dumps(log_entry) + '\n')
+        service_log.write(records.encode(record))
+        if _echo:
+            print(records.format_record(record), flush=True)
     except Exception as e:
         print(f"Error writing to log file: {e}")
 
-def main():
+def log_message(message, success=True):
+    """Write log message to a file that the main app can read"""
+    log_record(records.message_record(message, success, timestamp=time.time()))
+
+def main(config_path=None, workers=1, wake_mode=None):
     try:
         log_to_file("Service main() started")
         
-        # Get the PythonService instance after the service has started
-        PythonService = autoclass('org.kivy.android.PythonService')
-        if PythonService and PythonService.mService:
-            PythonService.mService.setAutoRestartService(True)
+        if enable_auto_restart():
             log_to_file("Auto-restart service enabled")
         
         # Log service start
@@ -161,48 +154,216 @@ def main():
         except Exception as e:
             log_to_file(f"Failed to send initial notification: {e}")
         
-        endpoints = ["https://vasset-kezx.onrender.com/api/v1/utils/health-check/"]
-        base_interval = 55
-        extra_interval_min = 5
-        extra_interval_max = 10
+        import asyncio
+        from services.http_pool import SessionPool
+        from services.config import ConfigWatcher, load_collector, load_schedule, reconcile
+        from services.endpoint_state import HealthTracker, UP, DOWN
+        from services.metrics import ProbeMetrics
+        from services.probe_engine import Endpoint, ProbeEngine
+        from services.result_store import ResultStore
+        from services.scheduler import EndpointScheduler
+        from services.upload_queue import UploadQueue
+        from services.wake_policy import create_policy
+        from services.workers import WorkerPool
+        
+        default_endpoints = [
+            Endpoint("https://vasset-kezx.onrender.com/api/v1/utils/health-check/")
+        ]
+        config_path = config_path or get_config_path()
+        config_watcher = ConfigWatcher(config_path)
+        try:
+            endpoints = config_watcher.poll() or default_endpoints
+        except Exception as e:
+            log_to_file(f"Invalid endpoint config {config_path}, using defaults: {e}")
+            endpoints = default_endpoints
+        log_to_file(f"Monitoring {len(endpoints)} endpoints from {config_path}")
+        max_concurrency = 20
+        pool_size = 4
+        pool_idle_timeout = 300
+        pool_stats_every = 100
+        # The snapshot covers every endpoint, so it is written on a timer
+        # rather than per probe
+        metrics_interval = 60
+        config_check_interval = 5
+
+        engine = None
+        worker_pool = None
+        result_store = ResultStore(get_log_file_path('results'))
+        metrics = ProbeMetrics()
+        metrics_file = get_log_file_path('metrics.json')
+        tracker = HealthTracker()
+        notifier = get_notifier()
+        probe_count = 0
+        # Last known state per url; followed through transitions so it also
+        # works when the trackers live in worker processes
+        states = {}
+
+        try:
+            schedule = load_schedule(config_path)
+        except Exception as e:
+            log_to_file(f"Invalid schedule config {config_path}, probing continuously: {e}")
+            schedule = {}
+        if wake_mode:
+            schedule['mode'] = wake_mode
+        wake_policy = create_policy(**schedule)
+        log_to_file(f"Wake mode: {wake_policy.mode}")
+
+        upload_queue = None
+        try:
+            collector = load_collector(config_path)
+        except Exception as e:
+            log_to_file(f"Invalid collector config {config_path}, not uploading results: {e}")
+            collector = None
+        if collector:
+            upload_queue = UploadQueue(get_log_file_path('upload_queue'), log=log_to_file, **collector)
+            upload_queue.start()
+            log_to_file(f"Uploading results to {upload_queue.collector_url} ({upload_queue.pending()} queued)")
+
+        def on_result(result):
+            nonlocal probe_count
+            # Only state changes are logged and alerted on; steady state
+            # probes still go to the result store and metrics
+            transition = result.transition
+            if transition is not None:
+                states[result.endpoint.url] = transition.new
+                log_record(records.transition_record(result, transition))
+                if transition.new == DOWN or (transition.new == UP and transition.old == DOWN):
+                    notifier.alert(transition.new, result.endpoint.url)
+            try:
+                result_store.record(result)
+            except Exception as e:
+                log_to_file(f"Failed to store probe result: {e}")
+            if upload_queue is not None:
+                try:
+                    upload_queue.put(result)
+                except Exception as e:
+                    log_to_file(f"Failed to queue probe result for upload: {e}")
+            log_probe(result, states.get(result.endpoint.url))
+            metrics.record(result)
+            probe_count += 1
+            if probe_count % pool_stats_every == 0:
+                if worker_pool is not None:
+                    log_to_file(f"Probe worker stats: {worker_pool.stats()}")
+                else:
+                    log_to_file(f"Connection pool stats: {engine.pool.stats()}")
+
+        def on_probe_error(endpoint, error):
+            trace = ''.join(traceback.format_exception(type(error), error, error.__traceback__))
+            log_to_file(f"Error probing {endpoint.url}: {error}\n{trace}")
+
+        scheduler = None
+
+        def reload_config():
+            # Picks up edits to the config file without restarting the service
+            nonlocal endpoints
+            try:
+                new_endpoints = config_watcher.poll()
+            except Exception as e:
+                log_to_file(f"Ignoring invalid endpoint config {config_path}: {e}")
+                return
+            if new_endpoints is None:
+                return
+            if worker_pool is not None:
+                worker_pool.update(new_endpoints)
+                endpoints = new_endpoints
+                summary = f"{len(endpoints)} endpoints"
+            else:
+                endpoints, summary = reconcile(scheduler, endpoints, new_endpoints, tracker)
+            log_message(f"Endpoint config reloaded: {summary}", True)
+
+        metrics_written = time.monotonic()
+
+        def housekeeping():
+            nonlocal metrics_written
+            reload_config()
+            if time.monotonic() - metrics_written >= metrics_interval:
+                metrics_written = time.monotonic()
+                try:
+                    metrics.write_snapshot(metrics_file)
+                except Exception as e:
+                    log_to_file(f"Failed to write metrics: {e}")
+
+        if workers > 1:
+            # Large fleets: shard endpoints across processes; each worker has
+            # its own engine, scheduler and health tracker
+            log_to_file(f"Sharding endpoints across {workers} probe workers (wake mode is not applied)")
+            worker_pool = WorkerPool(endpoints, workers=workers, concurrency=max_concurrency, log=log_to_file)
+            worker_pool.start()
+            try:
+                worker_pool.run_forever(
+                    on_result,
+                    housekeeping=housekeeping,
+                    housekeeping_interval=config_check_interval
+                )
+            finally:
+                worker_pool.stop()
+            return
+
+        engine = ProbeEngine(
+            concurrency=max_concurrency,
+            pool=SessionPool(pool_size=pool_size, idle_timeout=pool_idle_timeout)
+        )
+
+        restart_delay = min_restart_delay = 5
+        max_restart_delay = 300
 
         while True:
+            started = time.monotonic()
             try:
-                current_time = get_formatted_time()
-                log_to_file(f"Service running at {current_time}")
-                
-                for endpoint in endpoints:
-                    try:
-                        response = requests.get(endpoint, timeout=30)
-                        if response.ok:
-                            message = f"✓ Successfully pinged {endpoint}: {response.status_code}"
-                            log_message(message, True)
-                        else:
-                            message = f"⚠ Ping failed for {endpoint}: {response.status_code}"
-                            log_message(message, False)
-                    except Exception as e:
-                        message = f"✗ Error pinging {endpoint}: {str(e)}"
-                        log_message(message, False)
-                
-                sleep_time = base_interval + random.randint(extra_interval_min, extra_interval_max)
-                time.sleep(sleep_time)
+                log_to_file(f"Service running at {get_formatted_time()}")
+
+                # Every endpoint keeps its own interval and jitter, so probes
+                # are spread out instead of firing together
+                scheduler = EndpointScheduler(clock=wake_policy.clock)
+                scheduler.add_spread(endpoints)
+                asyncio.run(engine.run_forever(
+                    scheduler,
+                    on_result,
+                    tracker,
+                    housekeeping=housekeeping,
+                    housekeeping_interval=config_check_interval,
+                    wake_policy=wake_policy,
+                    on_error=on_probe_error
+                ))
                 
             except Exception as e:
                 log_to_file(f"Error in service main loop: {e}\n{traceback.format_exc()}")
-                time.sleep(60)  # Wait a minute before retrying
+                # Back off on repeated crashes, but start over after a good run
+                if time.monotonic() - started > max_restart_delay:
+                    restart_delay = min_restart_delay
+                time.sleep(restart_delay)
+                restart_delay = min(restart_delay * 2, max_restart_delay)
                 
     except Exception as e:
         log_to_file(f"Service main() crashed: {e}\n{traceback.format_exc()}")
 
-# if __name__ == '__main__':
-#     try:
-#         log_to_file("Service starting from __main__")
-#         main()
-#     except Exception as e:
-#         log_to_file(f"Service crashed from __main__: {e}\n{traceback.format_exc()}")
-
-try:
-    log_to_file("Service starting from ping_service")
-    main()
-except Exception as e:
-    log_to_file(f"Service crashed from ping_service: {e}\n{traceback.format_exc()}")
\ No newline at end of file
+def run_headless(argv=None):
+    """Command line entry point: run the probe engine without Android"""
+    global _echo
+    from services.wake_policy import WAKE_MODES
+
+    parser = argparse.ArgumentParser(description="Run the endpoint ping service headless")
+    parser.add_argument('--config', help="endpoint config TOML (default: endpoints.toml in the data dir)")
+    parser.add_argument('--data-dir', help="directory for logs, results and metrics (default: the working directory)")
+    parser.add_argument('--quiet', action='store_true', help="do not echo service log lines")
+    parser.add_argument('--workers', type=int, default=1, help="number of probe worker processes")
+    parser.add_argument('--wake-mode', choices=WAKE_MODES, help="override the [schedule] mode from the config")
+    args = parser.parse_args(argv)
+
+    if args.data_dir:
+        set_data_dir(args.data_dir)
+    _echo = not args.quiet
+    main(config_path=args.config, workers=args.workers, wake_mode=args.wake_mode)
+
+if is_service_process():
+    # Started by python-for-android as the foreground service
+    try:
+        log_to_file("Service starting from ping_service")
+        main()
+    except Exception as e:
+        log_to_file(f"Service crashed from ping_service: {e}\n{traceback.format_exc()}")
+elif __name__ == '__main__':
+    try:
+        run_headless()
+    except KeyboardInterrupt:
+        pass
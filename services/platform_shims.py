@@ -0,0 +1,67 @@
+"""
+Platform-specific pieces of the ping service, with desktop fallbacks.
+
+On Android the service runs inside python-for-android and talks to the OS
+through pyjnius. Everywhere else (desktop, servers, benchmarks) these
+helpers degrade to plain files and stdout, so the probe engine can run
+headless without jnius or PythonService being importable.
+"""
+import functools
+import os
+
+_data_dir = None
+
+
+def is_android():
+    """True when running under python-for-android"""
+    return 'ANDROID_ARGUMENT' in os.environ or 'PYTHON_SERVICE_ARGUMENT' in os.environ
+
+
+def is_service_process():
+    """True inside the python-for-android foreground service (not the app)"""
+    return 'PYTHON_SERVICE_ARGUMENT' in os.environ
+
+
+def set_data_dir(path):
+    """Override where logs, results and config live when not on Android"""
+    global _data_dir
+    _data_dir = os.path.abspath(path)
+
+
+@functools.lru_cache(maxsize=None)
+def get_android_external_files_dir():
+    """Get the Android external files directory path (resolved once, the JNI lookups are costly)"""
+    if not is_android():
+        return None
+    try:
+        from jnius import autoclass, cast
+        PythonActivity = autoclass('org.kivy.android.PythonActivity')
+        activity = PythonActivity.mActivity
+        context = cast('android.content.Context', activity)
+        return context.getExternalFilesDir(None).getAbsolutePath()
+    except Exception:
+        return None
+
+
+def get_data_dir():
+    """
+    Where logs, results and config live: the app's external files directory
+    on Android, otherwise the --data-dir override or the working directory
+    (never the package itself)
+    """
+    external_dir = get_android_external_files_dir()
+    if external_dir:
+        return external_dir
+    return _data_dir or os.getcwd()
+
+
+def enable_auto_restart():
+    """Ask python-for-android to restart the service if it gets killed; False off Android"""
+    if not is_android():
+        return False
+    from jnius import autoclass
+    PythonService = autoclass('org.kivy.android.PythonService')
+    if PythonService and PythonService.mService:
+        PythonService.mService.setAutoRestartService(True)
+        return True
+    return False
@@ -0,0 +1,383 @@
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+from services.endpoint_state import Transition
+from services.http_pool import SessionPool, RequestTimings
+
+DEFAULT_CONCURRENCY = 20
+DEFAULT_TIMEOUT = 30
+DEFAULT_INTERVAL = 60
+DEFAULT_JITTER = 5
+DEFAULT_MAX_BODY_BYTES = 1024
+# Unread body up to this size is drained rather than dropping the
+# connection: a fresh TCP + TLS handshake (certificate chain included)
+# costs several kilobytes and extra round trips
+MAX_DRAIN_BYTES = 16 * 1024
+
+# Probe modes: how much of the response is transferred
+MODE_GET = 'get'            # full response body
+MODE_HEAD = 'head'          # HEAD request, no body at all
+MODE_HEADERS = 'headers'    # stop after the headers
+MODE_CAPPED = 'capped'      # read at most max_body_bytes of the body
+PROBE_MODES = (MODE_GET, MODE_HEAD, MODE_HEADERS, MODE_CAPPED)
+
+# Error classes, stored as a single byte in the result store
+ERROR_NONE = 0
+ERROR_HTTP = 1
+ERROR_TIMEOUT = 2
+ERROR_CONNECTION = 3
+ERROR_TLS = 4
+ERROR_OTHER = 5
+
+
+def classify_error(error):
+    """Map a probe exception onto one of the ERROR_* classes"""
+    if isinstance(error, (requests.exceptions.Timeout, asyncio.TimeoutError)):
+        return ERROR_TIMEOUT
+    if isinstance(error, requests.exceptions.SSLError):
+        return ERROR_TLS
+    if isinstance(error, requests.exceptions.ConnectionError):
+        return ERROR_CONNECTION
+    return ERROR_OTHER
+
+
+class Endpoint:
+    """A monitored URL together with its probe settings"""
+
+    def __init__(self, url, timeout=DEFAULT_TIMEOUT, interval=DEFAULT_INTERVAL, jitter=DEFAULT_JITTER,
+                 method='GET', expected_status=None, body_contains=None,
+                 mode=MODE_GET, max_body_bytes=DEFAULT_MAX_BODY_BYTES, conditional=False, addresses=None):
+        self.url = url
+        self.timeout = timeout
+        # Seconds between probes, plus up to `jitter` random extra seconds
+        self.interval = interval
+        self.jitter = jitter
+        self.method = method
+        # Status codes that count as healthy; None accepts any 2xx/3xx
+        self.expected_status = expected_status
+        # Text the response body must contain to count as healthy
+        self.body_contains = body_contains
+        # One of PROBE_MODES
+        self.mode = mode
+        self.max_body_bytes = max_body_bytes
+        # Send If-None-Match / If-Modified-Since from the previous response
+        self.conditional = conditional
+        # IP addresses to connect to instead of resolving the host name
+        self.addresses = addresses
+
+    def __repr__(self):
+        return f"Endpoint({self.url!r})"
+
+    def settings(self):
+        """Everything that affects how the endpoint is probed, for change detection"""
+        expected = tuple(self.expected_status) if self.expected_status is not None else None
+        addresses = tuple(self.addresses) if self.addresses else None
+        return (
+            self.url, self.method, expected, self.body_contains, self.interval, self.jitter,
+            self.timeout, self.mode, self.max_body_bytes, self.conditional, addresses
+        )
+
+    def check(self, response, body=None, revalidated=False):
+        """
+        Whether `response` counts as healthy for this endpoint. `body` is the
+        (possibly capped) body text; `revalidated` means a 304 answered a
+        conditional request and is healthy.
+        """
+        if revalidated and response.status_code == 304:
+            return True
+        if self.expected_status is not None:
+            healthy = response.status_code in self.expected_status
+        else:
+            healthy = response.ok
+        if healthy and self.body_contains is not None:
+            healthy = body is not None and self.body_contains in body
+        return healthy
+
+
+class ProbeResult:
+    """Outcome of a single probe against an endpoint"""
+
+    def __init__(self, endpoint, ok, status_code=None, latency=None, error=None, timings=None):
+        self.endpoint = endpoint
+        self.ok = ok
+        self.status_code = status_code
+        self.latency = latency
+        self.error = error
+        # RequestTimings phase breakdown, None when no response arrived
+        self.timings = timings
+        # endpoint_state.Transition when this result changed the endpoint's state
+        self.transition = None
+        if error is not None:
+            self.error_class = classify_error(error)
+        elif not ok:
+            self.error_class = ERROR_HTTP
+        else:
+            self.error_class = ERROR_NONE
+        self.timestamp = time.time()
+
+    def to_record(self):
+        """Plain picklable tuple, for sending results between processes"""
+        timings = None
+        if self.timings is not None:
+            timings = tuple(getattr(self.timings, name) for name in RequestTimings.__slots__)
+        transition = None
+        if self.transition is not None:
+            transition = (self.transition.old, self.transition.new, self.transition.failures)
+        error = None if self.error is None else str(self.error)
+        return (
+            self.endpoint.url, self.ok, self.status_code, self.latency, error,
+            self.error_class, self.timestamp, timings, transition
+        )
+
+    @classmethod
+    def from_record(cls, endpoint, record):
+        """Rebuild a result produced by to_record() for `endpoint`"""
+        _, ok, status_code, latency, error, error_class, timestamp, timings, transition = record
+        result = cls(endpoint, ok, status_code=status_code, latency=latency, error=error)
+        result.error_class = error_class
+        result.timestamp = timestamp
+        if timings is not None:
+            result.timings = RequestTimings()
+            for name, value in zip(RequestTimings.__slots__, timings):
+                setattr(result.timings, name, value)
+        if transition is not None:
+            result.transition = Transition(endpoint, *transition)
+        return result
+
+    @property
+    def handshake_time(self):
+        """Part of latency spent on DNS/TCP/TLS setup, 0 on a reused connection"""
+        return self.timings.handshake if self.timings else 0.0
+
+
+class ProbeEngine:
+    """
+    Probe many endpoints concurrently.
+
+    The blocking HTTP calls run on a thread pool driven by asyncio, so a
+    cycle takes as long as its slowest endpoint rather than the sum of all
+    of them. At most `concurrency` probes are in flight at any time.
+    Connections are reused between probes through a SessionPool.
+
+    Each endpoint's mode decides how much of the response is transferred;
+    gzip/deflate are always negotiated by requests. Conditional endpoints
+    remember the last ETag/Last-Modified and send them back, so an
+    unchanged resource costs a bodiless 304.
+    """
+
+    def __init__(self, concurrency=DEFAULT_CONCURRENCY, pool=None):
+        self.concurrency = concurrency
+        self.pool = pool or SessionPool()
+        self._validators = {}
+        self._running = False
+        self._wake = None
+        self._executor = ThreadPoolExecutor(
+            max_workers=concurrency,
+            thread_name_prefix='probe'
+        )
+
+    def _conditional_headers(self, endpoint):
+        etag, last_modified = self._validators.get(endpoint.url, (None, None))
+        headers = {}
+        if etag:
+            headers['If-None-Match'] = etag
+        if last_modified:
+            headers['If-Modified-Since'] = last_modified
+        return headers
+
+    def _read_body(self, endpoint, response):
+        """
+        Read as much of the body as the endpoint's mode allows and return it
+        as text (None when not read). The connection goes back to the pool
+        whenever the rest of the body is small enough to drain; only large
+        or unbounded bodies make it close early.
+        """
+        if endpoint.mode == MODE_GET:
+            return response.text
+        length = response.headers.get('Content-Length')
+        length = int(length) if length is not None and length.isdigit() else None
+        if endpoint.mode == MODE_HEAD or length == 0:
+            # No body to read; this returns the connection to the pool
+            response.content
+            return None
+        if length is not None and length <= endpoint.max_body_bytes:
+            return response.text
+        body = None
+        if endpoint.mode == MODE_CAPPED:
+            data = response.raw.read(endpoint.max_body_bytes, decode_content=True)
+            body = data.decode(response.encoding or 'utf-8', errors='replace')
+        if length is not None and length - response.raw.tell() <= MAX_DRAIN_BYTES:
+            response.raw.drain_conn()
+            response.raw.release_conn()
+        else:
+            response.close()
+        return body
+
+    def _fetch(self, endpoint):
+        """Blocking probe, runs on a worker thread"""
+        start = time.perf_counter()
+        method = 'HEAD' if endpoint.mode == MODE_HEAD else endpoint.method
+        headers = self._conditional_headers(endpoint) if endpoint.conditional else {}
+        try:
+            response, timings = self.pool.request(
+                method,
+                endpoint.url,
+                timeout=endpoint.timeout,
+                headers=headers,
+                stream=True,
+                addresses=endpoint.addresses
+            )
+            body = self._read_body(endpoint, response)
+        except Exception as e:
+            return ProbeResult(endpoint, False, latency=time.perf_counter() - start, error=e)
+
+        if endpoint.conditional and response.status_code != 304:
+            self._validators[endpoint.url] = (
+                response.headers.get('ETag'),
+                response.headers.get('Last-Modified')
+            )
+        return ProbeResult(
+            endpoint,
+            endpoint.check(response, body, revalidated=bool(headers)),
+            status_code=response.status_code,
+            latency=time.perf_counter() - start,
+            timings=timings
+        )
+
+    async def probe(self, endpoint, semaphore):
+        await semaphore.acquire()
+        loop = asyncio.get_running_loop()
+        future = loop.run_in_executor(self._executor, self._fetch, endpoint)
+        # A timed out probe keeps running on its thread (a stuck DNS lookup
+        # cannot be interrupted), so its slot is only given back once the
+        # thread is free; otherwise later probes would queue up behind it in
+        # the executor and time out without ever being sent
+        future.add_done_callback(lambda f: semaphore.release())
+        try:
+            # requests' timeout applies per socket operation, so bound the
+            # whole probe as well
+            return await asyncio.wait_for(asyncio.shield(future), endpoint.timeout)
+        except asyncio.TimeoutError:
+            return ProbeResult(
+                endpoint,
+                False,
+                latency=endpoint.timeout,
+                error=asyncio.TimeoutError(f"timed out after {endpoint.timeout}s")
+            )
+
+    async def probe_all(self, endpoints):
+        """Probe every endpoint concurrently, results keep the input order"""
+        semaphore = asyncio.Semaphore(self.concurrency)
+        return await asyncio.gather(*(self.probe(e, semaphore) for e in endpoints))
+
+    async def run_forever(self, scheduler, on_result, tracker=None, housekeeping=None, housekeeping_interval=5.0,
+                          wake_policy=None, on_error=None):
+        """
+        Probe endpoints as they fall due on `scheduler`.
+
+        Each endpoint is rescheduled once its probe finishes, so a slow
+        endpoint never holds back the others. With a HealthTracker the next
+        interval follows the endpoint's state and result.transition is set
+        on state changes. `on_result` is called on the event loop with
+        every ProbeResult, and `housekeeping` (if given) roughly every
+        `housekeeping_interval` seconds, e.g. to reload the endpoint list.
+        A WakePolicy, if given, decides when due probes go out and may
+        stretch intervals to save battery; `scheduler` must then use the
+        policy's clock. In its aligned modes housekeeping only runs at the
+        aligned wakeups, so it never adds wakeups of its own.
+
+        Runs until stop() is called, from `housekeeping` or another thread.
+
+        An exception while probing or handling a result is passed to
+        `on_error(endpoint, error)` (printed if not given) and the endpoint
+        stays scheduled. Probes still in flight are cancelled when this
+        coroutine exits.
+        """
+        semaphore = asyncio.Semaphore(self.concurrency)
+        wakeup = asyncio.Event()
+        in_flight = set()
+        loop = asyncio.get_running_loop()
+        self._wake = lambda: loop.call_soon_threadsafe(wakeup.set)
+        self._running = True
+        if wake_policy is not None:
+            wake_policy.bind(self._wake)
+        aligned = wake_policy is not None and wake_policy.aligned
+
+        async def run_one(endpoint):
+            interval = None
+            try:
+                result = await self.probe(endpoint, semaphore)
+                if tracker is not None:
+                    result.transition = tracker.observe(result)
+                    interval = tracker.interval_for(endpoint)
+                if wake_policy is not None:
+                    interval = wake_policy.interval(endpoint.interval if interval is None else interval)
+                self.pool.evict_idle()
+                on_result(result)
+            except Exception as e:
+                if on_error is not None:
+                    on_error(endpoint, e)
+                else:
+                    print(f"Error probing {endpoint.url}: {e!r}")
+            finally:
+                # Whatever happened, the endpoint must not drop off the schedule
+                scheduler.reschedule(endpoint, interval=interval)
+                wakeup.set()
+
+        try:
+            last_housekeeping = scheduler.clock()
+            while self._running:
+                if housekeeping is not None and scheduler.clock() - last_housekeeping >= housekeeping_interval:
+                    housekeeping()
+                    last_housekeeping = scheduler.clock()
+                    if not self._running:
+                        break
+
+                now = scheduler.clock()
+                cutoff = now if wake_policy is None else wake_policy.cutoff(now)
+                for endpoint in scheduler.pop_due(cutoff):
+                    task = asyncio.create_task(run_one(endpoint))
+                    in_flight.add(task)
+                    task.add_done_callback(in_flight.discard)
+
+                next_due = scheduler.next_due()
+                now = scheduler.clock()
+                if wake_policy is not None:
+                    delay = wake_policy.delay(next_due, now)
+                else:
+                    delay = None if next_due is None else max(0.0, next_due - now)
+                if housekeeping is not None and not (aligned and delay is not None):
+                    delay = housekeeping_interval if delay is None else min(delay, housekeeping_interval)
+                wakeup.clear()
+                # Timed with a callback rather than wait_for(), which can
+                # swallow a cancellation that lands as the event is set
+                timer = None if delay is None else loop.call_later(delay, wakeup.set)
+                try:
+                    await wakeup.wait()
+                finally:
+                    if timer is not None:
+                        timer.cancel()
+        finally:
+            self._running = False
+            self._wake = None
+            for task in in_flight:
+                task.cancel()
+            await asyncio.gather(*in_flight, return_exceptions=True)
+
+    def stop(self):
+        """Make run_forever() return; safe to call from any thread"""
+        self._running = False
+        wake = self._wake
+        if wake is not None:
+            wake()
+
+    def run_cycle(self, endpoints):
+        """Run one probe cycle from synchronous code"""
+        return asyncio.run(self.probe_all(endpoints))
+
+    def close(self):
+        self._executor.shutdown(wait=False)
+        self.pool.close()
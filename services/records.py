@@ -0,0 +1,126 @@
+"""
+Compact binary records sent from the service to the UI.
+
+Records carry typed fields (timestamps, enums, status codes, latency)
+rather than preformatted text, so they are cheap to encode and decode and
+the UI only builds the display string for rows it actually shows.
+
+Layout (little endian): a fixed header packed with HEADER, then the url
+(length-prefixed UTF-8) and a free-text detail field taking the rest.
+"""
+import math
+import struct
+from collections import namedtuple
+from datetime import datetime, timezone
+
+from services.endpoint_state import UP, DEGRADED, DOWN
+
+# Record kinds
+KIND_MESSAGE = 0        # free-text service message
+KIND_TRANSITION = 1     # an endpoint changed state
+KIND_PROBE = 2          # one probe result, for the dashboard
+
+# Outcome of the probe (or success flag of a message)
+STATUS_OK = 0
+STATUS_FAILED = 1       # got a response, but it did not pass the checks
+STATUS_ERROR = 2        # no usable response (timeout, connection error, ...)
+
+STATES = (None, UP, DEGRADED, DOWN)
+_STATE_CODES = {state: code for code, state in enumerate(STATES)}
+
+# timestamp, kind, status, state, old state, error class, failures, status code, latency ms, url length
+HEADER = struct.Struct('<dBBBBBHHfH')
+# Consecutive failures are counted without limit but stored as an H
+MAX_FAILURES = 0xFFFF
+
+Record = namedtuple('Record', [
+    'timestamp', 'kind', 'status', 'state', 'old_state', 'error_class',
+    'failures', 'code', 'latency_ms', 'url', 'detail',
+])
+
+
+def encode(record):
+    """Record -> bytes"""
+    url = (record.url or '').encode('utf-8')
+    latency = math.nan if record.latency_ms is None else record.latency_ms
+    return HEADER.pack(
+        record.timestamp or 0.0, record.kind, record.status,
+        _STATE_CODES[record.state], _STATE_CODES[record.old_state], record.error_class,
+        record.failures, record.code or 0, latency, len(url)
+    ) + url + (record.detail or '').encode('utf-8')
+
+
+def decode(data):
+    """bytes -> Record"""
+    timestamp, kind, status, state, old_state, error_class, failures, code, latency, url_length = \
+        HEADER.unpack_from(data)
+    offset = HEADER.size
+    url = data[offset:offset + url_length].decode('utf-8')
+    detail = data[offset + url_length:].decode('utf-8')
+    return Record(
+        timestamp or None, kind, status, STATES[state], STATES[old_state], error_class,
+        failures, code or None, None if latency != latency else latency, url, detail
+    )
+
+
+def _status(result):
+    if result.error is not None:
+        return STATUS_ERROR
+    return STATUS_OK if result.ok else STATUS_FAILED
+
+
+def _latency_ms(result):
+    return None if result.latency is None else result.latency * 1000
+
+
+def message_record(message, success=True, timestamp=None):
+    """A free-text message; shown without a time prefix when `timestamp` is None"""
+    return Record(
+        timestamp, KIND_MESSAGE, STATUS_OK if success else STATUS_FAILED, None, None, 0,
+        0, None, None, '', message
+    )
+
+
+def transition_record(result, transition):
+    """The state change `transition`, caused by `result`"""
+    return Record(
+        result.timestamp, KIND_TRANSITION, _status(result), transition.new, transition.old,
+        result.error_class, min(transition.failures, MAX_FAILURES), result.status_code, _latency_ms(result),
+        result.endpoint.url, None if result.error is None else str(result.error)
+    )
+
+
+def probe_record(result, state):
+    """
+    One probe result and the endpoint's state after it. Latency is only
+    sent for healthy probes; a failure's time-to-error is not a latency.
+    """
+    latency = _latency_ms(result) if result.ok else None
+    return Record(
+        result.timestamp, KIND_PROBE, _status(result), state, None, result.error_class,
+        0, result.status_code, latency, result.endpoint.url, None
+    )
+
+
+def format_record(record):
+    """Display text of a record, in the format the UI log has always used"""
+    if record.kind == KIND_MESSAGE:
+        text = record.detail
+    else:
+        if record.status == STATUS_ERROR:
+            text = f"✗ Error pinging {record.url}: {record.detail}"
+        elif record.status == STATUS_OK:
+            text = f"✓ Successfully pinged {record.url}: {record.code}"
+        else:
+            text = f"⚠ Ping failed for {record.url}: {record.code}"
+        if record.kind == KIND_TRANSITION:
+            if record.state == UP and record.old_state in (DEGRADED, DOWN):
+                text += f" (recovered after {record.failures} failed probes)"
+            elif record.state == DEGRADED:
+                text += " (degraded, re-checking)"
+            elif record.state == DOWN:
+                text += f" (down after {record.failures} failed probes, backing off)"
+    if record.timestamp is None:
+        return text
+    timestamp = datetime.fromtimestamp(record.timestamp, timezone.utc).strftime('%Y-%m-%d %H:%M:%S')
+    return f"[{timestamp}] {text}"
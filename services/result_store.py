@@ -0,0 +1,362 @@
+import json
+import os
+import struct
+import threading
+import time
+from collections import namedtuple
+
+from services.histogram import LatencyHistogram
+
+# timestamp, endpoint id, status code, latency (ms), error class
+RECORD = struct.Struct('<dHHfB')
+# bucket start, endpoint id, count, failures, p50, p95, p99 (ms)
+ROLLUP = struct.Struct('<IHIIfff')
+
+MINUTE = 60
+HOUR = 3600
+DEFAULT_RETENTION_DAYS = 30
+DEFAULT_HOUR_RETENTION_DAYS = 365
+
+Record = namedtuple('Record', 'timestamp endpoint_id status_code latency_ms error_class')
+Rollup = namedtuple('Rollup', 'start endpoint_id count failures p50 p95 p99')
+
+
+class _Bucket:
+    def __init__(self, start):
+        self.start = start
+        self.count = 0
+        self.failures = 0
+        self.histogram = LatencyHistogram()
+
+    def add(self, latency_ms, ok):
+        self.count += 1
+        if ok:
+            self.histogram.record(latency_ms)
+        else:
+            # A timeout or refused connection is not a latency
+            self.failures += 1
+
+    def to_rollup(self, endpoint_id):
+        p = self.histogram.percentiles()
+        return Rollup(self.start, endpoint_id, self.count, self.failures, p[50], p[95], p[99])
+
+
+class _RecordFile:
+    """Read side of a file of fixed-width records sorted by their first field"""
+
+    def __init__(self, path, fmt):
+        self.path = path
+        self.fmt = fmt
+
+    def _key_at(self, f, index):
+        f.seek(index * self.fmt.size)
+        return self.fmt.unpack(f.read(self.fmt.size))[0]
+
+    def _bisect(self, f, count, value):
+        lo, hi = 0, count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._key_at(f, mid) < value:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    def read_range(self, since, until):
+        """Records with since <= key < until, found by binary search"""
+        try:
+            f = open(self.path, 'rb')
+        except FileNotFoundError:
+            return []
+        with f:
+            count = os.fstat(f.fileno()).st_size // self.fmt.size
+            start = self._bisect(f, count, since)
+            end = self._bisect(f, count, until)
+            f.seek(start * self.fmt.size)
+            return list(self.fmt.iter_unpack(f.read((end - start) * self.fmt.size)))
+
+
+class ResultStore:
+    """
+    Persistent, compact store of probe results.
+
+    Every probe is appended as one fixed-width record to a per-day raw file.
+    Minute and hour rollups (count, failures, p50/p95/p99 latency of the
+    successful probes) are kept in memory while their bucket is open and
+    appended as fixed-width records once it closes. Minute rollups go to
+    one file per day; hour rollups to one file per endpoint and month, so
+    a long-range query for one endpoint reads only that endpoint's rows,
+    found by binary search. Open buckets are never written early; on
+    startup they are rebuilt from the raw records, so a restart neither
+    loses them nor writes partial rows. Raw and minute files older than
+    `retention_days` are deleted, hour files older than
+    `hour_retention_days`.
+    """
+
+    def __init__(self, directory, retention_days=DEFAULT_RETENTION_DAYS,
+                 hour_retention_days=DEFAULT_HOUR_RETENTION_DAYS):
+        self.directory = directory
+        self.retention_days = retention_days
+        self.hour_retention_days = hour_retention_days
+        os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        # One JSON-encoded URL per line; the line number is the endpoint id
+        self._ids_path = os.path.join(directory, 'endpoints.jsonl')
+        self._urls = self._load_endpoint_ids()
+        self._ids = {url: i for i, url in enumerate(self._urls)}
+        self._ids_file = None
+        self._minutes = {}
+        self._hours = {}
+        self._current_minute = None
+        self._current_hour = None
+        self._raw_day = None
+        self._raw_file = None
+        self._split_legacy_hours()
+        self._restore_open_buckets()
+
+    def _load_endpoint_ids(self):
+        try:
+            with open(self._ids_path, encoding='utf-8') as f:
+                urls = []
+                for line in f:
+                    try:
+                        urls.append(json.loads(line))
+                    except ValueError:
+                        # A torn last line from a crash mid-write
+                        break
+                return urls
+        except FileNotFoundError:
+            pass
+        # Earlier versions kept the ids as a single JSON list
+        try:
+            with open(os.path.join(self.directory, 'endpoints.json')) as f:
+                urls = json.load(f)
+        except (FileNotFoundError, ValueError):
+            return []
+        with open(self._ids_path, 'w', encoding='utf-8') as f:
+            f.write(''.join(json.dumps(url) + '\n' for url in urls))
+        return urls
+
+    def endpoint_id(self, url):
+        """Stable small integer id for an endpoint URL"""
+        endpoint_id = self._ids.get(url)
+        if endpoint_id is None:
+            endpoint_id = len(self._urls)
+            self._urls.append(url)
+            self._ids[url] = endpoint_id
+            if self._ids_file is None:
+                self._ids_file = open(self._ids_path, 'a', encoding='utf-8')
+            self._ids_file.write(json.dumps(url) + '\n')
+            self._ids_file.flush()
+        return endpoint_id
+
+    def _restore_open_buckets(self):
+        """
+        Rebuild the minute and hour buckets that were still open when the
+        store was last closed (or killed) from the newest raw file.
+        """
+        raw_files = sorted(
+            name for name in os.listdir(self.directory)
+            if name.startswith('raw-') and name.endswith('.bin')
+        )
+        if not raw_files:
+            return
+        path = os.path.join(self.directory, raw_files[-1])
+        with open(path, 'r+b') as f:
+            size = os.fstat(f.fileno()).st_size
+            if size % RECORD.size:
+                # Drop a record torn by a crash, or every later one would be misaligned
+                f.truncate(size - size % RECORD.size)
+            count = size // RECORD.size
+            if not count:
+                return
+            f.seek((count - 1) * RECORD.size)
+            last = RECORD.unpack(f.read(RECORD.size))[0]
+        # Hours never straddle UTC days, so the open hour is all in this file
+        self._current_hour = int(last) // HOUR * HOUR
+        self._current_minute = int(last) // MINUTE * MINUTE
+        for timestamp, endpoint_id, _, latency_ms, error_class in \
+                _RecordFile(path, RECORD).read_range(self._current_hour, float('inf')):
+            ok = error_class == 0
+            self._bucket(self._hours, endpoint_id, self._current_hour).add(latency_ms, ok)
+            if int(timestamp) // MINUTE * MINUTE == self._current_minute:
+                self._bucket(self._minutes, endpoint_id, self._current_minute).add(latency_ms, ok)
+
+    def _split_legacy_hours(self):
+        """Earlier versions kept every endpoint's hour rollups in one hour.bin"""
+        path = os.path.join(self.directory, 'hour.bin')
+        try:
+            with open(path, 'rb') as f:
+                data = f.read()
+        except FileNotFoundError:
+            return
+        rows = {}
+        for offset in range(0, len(data) - ROLLUP.size + 1, ROLLUP.size):
+            row = data[offset:offset + ROLLUP.size]
+            start, endpoint_id = ROLLUP.unpack(row)[:2]
+            rows.setdefault(self._hour_path(self._month(start), endpoint_id), []).append(row)
+        for hour_path, packed in rows.items():
+            with open(hour_path, 'ab') as f:
+                f.write(b''.join(packed))
+        os.remove(path)
+
+    @staticmethod
+    def _bucket(buckets, endpoint_id, start):
+        bucket = buckets.get(endpoint_id)
+        if bucket is None:
+            bucket = buckets[endpoint_id] = _Bucket(start)
+        return bucket
+
+    def _path(self, kind, day):
+        return os.path.join(self.directory, f"{kind}-{day}.bin")
+
+    def _hour_path(self, month, endpoint_id):
+        return os.path.join(self.directory, f"hour-{month}-{endpoint_id}.bin")
+
+    @staticmethod
+    def _day(timestamp):
+        return time.strftime('%Y%m%d', time.gmtime(timestamp))
+
+    @staticmethod
+    def _month(timestamp):
+        return time.strftime('%Y%m', time.gmtime(timestamp))
+
+    def record(self, result):
+        """Append a ProbeResult and update its open minute and hour rollups"""
+        timestamp = result.timestamp
+        latency_ms = (result.latency or 0.0) * 1000
+        with self._lock:
+            endpoint_id = self.endpoint_id(result.endpoint.url)
+            day = self._day(timestamp)
+            if day != self._raw_day:
+                self._open_raw(day)
+            self._raw_file.write(RECORD.pack(
+                timestamp,
+                endpoint_id,
+                result.status_code or 0,
+                latency_ms,
+                result.error_class
+            ))
+            self._raw_file.flush()
+
+            minute = int(timestamp) // MINUTE * MINUTE
+            hour = int(timestamp) // HOUR * HOUR
+            if self._current_minute is not None and minute > self._current_minute:
+                self._flush(self._minutes, minute, 'minute')
+            if self._current_hour is not None and hour > self._current_hour:
+                self._flush(self._hours, hour, 'hour')
+            self._current_minute = max(minute, self._current_minute or 0)
+            self._current_hour = max(hour, self._current_hour or 0)
+
+            for buckets, start in ((self._minutes, minute), (self._hours, hour)):
+                self._bucket(buckets, endpoint_id, start).add(latency_ms, result.ok)
+
+    def _open_raw(self, day):
+        if self._raw_file is not None:
+            self._raw_file.close()
+        self._raw_file = open(self._path('raw', day), 'ab')
+        self._raw_day = day
+        self._prune()
+
+    def _flush(self, buckets, before, kind):
+        """Write out every bucket that started before `before`, oldest first"""
+        closed = sorted(
+            (bucket.start, endpoint_id) for endpoint_id, bucket in buckets.items()
+            if bucket.start < before
+        )
+        if not closed:
+            return
+        files = {}
+        try:
+            for start, endpoint_id in closed:
+                bucket = buckets.pop(endpoint_id)
+                if kind == 'minute':
+                    path = self._path(kind, self._day(start))
+                else:
+                    path = self._hour_path(self._month(start), endpoint_id)
+                f = files.get(path)
+                if f is None:
+                    f = files[path] = open(path, 'ab')
+                f.write(ROLLUP.pack(*self._pack_values(bucket.to_rollup(endpoint_id))))
+        finally:
+            for f in files.values():
+                f.close()
+
+    @staticmethod
+    def _pack_values(rollup):
+        nan = float('nan')
+        return (
+            rollup.start, rollup.endpoint_id, rollup.count, rollup.failures,
+            nan if rollup.p50 is None else rollup.p50,
+            nan if rollup.p95 is None else rollup.p95,
+            nan if rollup.p99 is None else rollup.p99,
+        )
+
+    def _prune(self):
+        now = time.time()
+        cutoff = self._day(now - self.retention_days * 86400)
+        hour_cutoff = self._month(now - self.hour_retention_days * 86400)
+        for name in os.listdir(self.directory):
+            kind, _, rest = name.partition('-')
+            if not rest.endswith('.bin'):
+                continue
+            if kind in ('raw', 'minute') and rest[:-4] < cutoff:
+                os.remove(os.path.join(self.directory, name))
+            elif kind == 'hour' and rest[:6] < hour_cutoff:
+                # Only once the whole month is past retention
+                os.remove(os.path.join(self.directory, name))
+
+    def rollups(self, url, since, until=None, resolution=HOUR):
+        """
+        Minute or hour rollups for one endpoint with since <= start < until.
+        The bucket that is still open is included as a partial rollup.
+        """
+        until = time.time() if until is None else until
+        with self._lock:
+            endpoint_id = self._ids.get(url)
+            if endpoint_id is None:
+                return []
+            days = range(int(since), int(until) + 86400, 86400)
+            if resolution == MINUTE:
+                paths = [self._path('minute', day) for day in sorted({self._day(t) for t in days})]
+                open_buckets = self._minutes
+            else:
+                months = sorted({self._month(t) for t in days})
+                paths = [self._hour_path(month, endpoint_id) for month in months]
+                open_buckets = self._hours
+
+            found = []
+            for path in paths:
+                for values in _RecordFile(path, ROLLUP).read_range(since, until):
+                    if values[1] == endpoint_id:
+                        found.append(Rollup(*values))
+            bucket = open_buckets.get(endpoint_id)
+            if bucket is not None and since <= bucket.start < until:
+                found.append(bucket.to_rollup(endpoint_id))
+            return found
+
+    def raw_records(self, since, until=None):
+        """Raw probe records for all endpoints with since <= timestamp < until"""
+        until = time.time() if until is None else until
+        with self._lock:
+            if self._raw_file is not None:
+                self._raw_file.flush()
+        records = []
+        for t in range(int(since), int(until) + 86400, 86400):
+            path = self._path('raw', self._day(t))
+            records.extend(Record(*values) for values in _RecordFile(path, RECORD).read_range(since, until))
+        return records
+
+    def close(self):
+        """
+        Close the files. Open rollups are not written; the next ResultStore
+        on this directory rebuilds them from the raw records.
+        """
+        with self._lock:
+            if self._ids_file is not None:
+                self._ids_file.close()
+                self._ids_file = None
+            if self._raw_file is not None:
+                self._raw_file.close()
+                self._raw_file = None
+                self._raw_day = None
@@ -0,0 +1,104 @@
+import heapq
+import itertools
+import random
+import time
+
+
+class EndpointScheduler:
+    """
+    Min-heap of endpoints keyed by their next due time.
+
+    Every endpoint carries its own interval and jitter, so probes spread out
+    over time instead of firing in one burst. Scheduling and rescheduling are
+    O(log n); removed entries are dropped lazily when they reach the top of
+    the heap. An endpoint stays a member while its probe is in flight, and
+    reschedule() ignores endpoints that were removed in the meantime.
+    """
+
+    def __init__(self, clock=time.monotonic, rng=None):
+        self.clock = clock
+        self._rng = rng or random.Random()
+        self._heap = []
+        self._entries = {}
+        self._members = set()
+        self._counter = itertools.count()
+        self._stale = 0
+
+    def __len__(self):
+        return len(self._members)
+
+    def __contains__(self, endpoint):
+        return endpoint in self._members
+
+    def add(self, endpoint, delay=0.0):
+        """Schedule an endpoint to be probed `delay` seconds from now"""
+        self._members.add(endpoint)
+        self._push(endpoint, self.clock() + delay)
+
+    def add_spread(self, endpoints):
+        """Schedule endpoints with their first probes evenly spread over the shortest interval"""
+        endpoints = list(endpoints)
+        if not endpoints:
+            return
+        window = min(e.interval for e in endpoints)
+        step = window / len(endpoints)
+        for i, endpoint in enumerate(endpoints):
+            self.add(endpoint, i * step)
+
+    def remove(self, endpoint):
+        self._members.discard(endpoint)
+        self._unqueue(endpoint)
+
+    def _unqueue(self, endpoint):
+        entry = self._entries.pop(endpoint, None)
+        if entry is not None:
+            entry[-1] = None
+            self._stale += 1
+            if self._stale > len(self._heap) // 2:
+                self._compact()
+
+    def reschedule(self, endpoint, now=None, interval=None):
+        """
+        Schedule the next probe one interval (plus jitter) after `now`.
+        `interval` overrides the endpoint's own interval, e.g. for backoff.
+        """
+        if endpoint not in self._members:
+            return
+        now = self.clock() if now is None else now
+        interval = endpoint.interval if interval is None else interval
+        jitter = self._rng.uniform(0, endpoint.jitter) if endpoint.jitter else 0.0
+        self._push(endpoint, now + interval + jitter)
+
+    def next_due(self):
+        """Due time of the earliest endpoint, or None when nothing is scheduled"""
+        self._drop_stale()
+        return self._heap[0][0] if self._heap else None
+
+    def pop_due(self, now=None):
+        """Remove and return every endpoint that is due at `now`"""
+        now = self.clock() if now is None else now
+        due = []
+        while True:
+            self._drop_stale()
+            if not self._heap or self._heap[0][0] > now:
+                return due
+            _, _, endpoint = heapq.heappop(self._heap)
+            del self._entries[endpoint]
+            due.append(endpoint)
+
+    def _push(self, endpoint, due):
+        if endpoint in self._entries:
+            self._unqueue(endpoint)
+        entry = [due, next(self._counter), endpoint]
+        self._entries[endpoint] = entry
+        heapq.heappush(self._heap, entry)
+
+    def _drop_stale(self):
+        while self._heap and self._heap[0][-1] is None:
+            heapq.heappop(self._heap)
+            self._stale -= 1
+
+    def _compact(self):
+        self._heap = [entry for entry in self._heap if entry[-1] is not None]
+        heapq.heapify(self._heap)
+        self._stale = 0
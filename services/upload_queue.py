@@ -0,0 +1,242 @@
+import gzip
+import json
+import os
+import threading
+import time
+import uuid
+
+DEFAULT_BATCH_SIZE = 500
+DEFAULT_MAX_BATCH_AGE = 60
+DEFAULT_SEGMENT_RECORDS = 10000
+MIN_RETRY_DELAY = 5
+MAX_RETRY_DELAY = 600
+UPLOAD_TIMEOUT = 30
+
+
+def get_device_id(directory):
+    """Random id for this installation, created once and kept in `directory`"""
+    path = os.path.join(directory, 'device_id')
+    try:
+        with open(path) as f:
+            return f.read().strip()
+    except FileNotFoundError:
+        device_id = uuid.uuid4().hex
+        os.makedirs(directory, exist_ok=True)
+        with open(path, 'w') as f:
+            f.write(device_id)
+        return device_id
+
+
+class UploadQueue:
+    """
+    Durable on-disk queue of probe results, uploaded in gzip batches.
+
+    Every result gets a sequence number and is appended as one JSON line to
+    a segment file, so nothing is lost while offline or across restarts. A
+    background thread posts batches of up to `batch_size` records to the
+    collector once that many are waiting or the oldest has waited
+    `max_batch_age` seconds, retrying with exponential backoff on failure.
+    Delivery is at-least-once; the collector deduplicates on
+    (device, seq). Segments are deleted once every record in them has been
+    acknowledged.
+    """
+
+    def __init__(self, directory, collector_url, device_id=None, batch_size=DEFAULT_BATCH_SIZE,
+                 max_batch_age=DEFAULT_MAX_BATCH_AGE, segment_records=DEFAULT_SEGMENT_RECORDS, log=print):
+        self.directory = directory
+        self.collector_url = collector_url
+        self.batch_size = batch_size
+        self.max_batch_age = max_batch_age
+        self.segment_records = segment_records
+        self.log = log
+        os.makedirs(directory, exist_ok=True)
+        self.device_id = device_id or get_device_id(directory)
+        self._ack_path = os.path.join(directory, 'acked')
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stopped = False
+        self._thread = None
+        self._segment = None
+        self._segment_count = 0
+        # (segment first seq, byte offset) just past the last acknowledged
+        # record; None until the first upload
+        self._cursor = None
+        self.acked = self._load_acked()
+        self.last_seq = self._recover_last_seq()
+        self._oldest_pending = time.monotonic() if self.pending() else None
+
+    def _segments(self):
+        names = sorted(n for n in os.listdir(self.directory) if n.startswith('segment-'))
+        return [(int(n[8:-6]), os.path.join(self.directory, n)) for n in names]
+
+    def _load_acked(self):
+        try:
+            with open(self._ack_path) as f:
+                return int(f.read().strip() or 0)
+        except (FileNotFoundError, ValueError):
+            return 0
+
+    def _recover_last_seq(self):
+        segments = self._segments()
+        if not segments:
+            return self.acked
+        last_seq = segments[-1][0] - 1
+        with open(segments[-1][1], 'rb') as f:
+            for line in f:
+                try:
+                    last_seq = json.loads(line)['seq']
+                except (ValueError, KeyError):
+                    # A torn final line from a crash mid-write
+                    break
+        return max(last_seq, self.acked)
+
+    def pending(self):
+        return self.last_seq - self.acked
+
+    def put(self, result):
+        """Queue a ProbeResult for upload"""
+        record = {
+            'seq': 0,
+            'ts': result.timestamp,
+            'url': result.endpoint.url,
+            'ok': result.ok,
+            'status': result.status_code,
+            'latency_ms': None if result.latency is None else round(result.latency * 1000, 2),
+            'error_class': result.error_class,
+        }
+        with self._lock:
+            self.last_seq += 1
+            record['seq'] = self.last_seq
+            if self._segment is None or self._segment_count >= self.segment_records:
+                if self._segment is not None:
+                    self._segment.close()
+                path = os.path.join(self.directory, f'segment-{self.last_seq:012d}.jsonl')
+                self._segment = open(path, 'ab')
+                self._segment_count = 0
+            self._segment.write(json.dumps(record, separators=(',', ':')).encode('utf-8') + b'\n')
+            self._segment.flush()
+            self._segment_count += 1
+            if self._oldest_pending is None:
+                self._oldest_pending = time.monotonic()
+            if self.pending() >= self.batch_size:
+                self._wakeup.set()
+
+    def _read_batch(self):
+        """
+        Up to batch_size unacknowledged records, oldest first, and the read
+        position just past the last one. Reading starts at the cursor left
+        by the previous acknowledgement and happens outside the lock, so
+        put() is never held up by it; only complete lines are consumed.
+        """
+        with self._lock:
+            acked = self.acked
+            segments = self._segments()
+            cursor = self._cursor
+        records = []
+        if not segments:
+            return records, cursor
+        if cursor is None:
+            cursor = (segments[0][0], 0)
+        end = cursor
+        for first_seq, path in segments:
+            if first_seq < cursor[0]:
+                continue
+            offset = cursor[1] if first_seq == cursor[0] else 0
+            with open(path, 'rb') as f:
+                f.seek(offset)
+                for line in f:
+                    if not line.endswith(b'\n'):
+                        # Still being written, or torn by a crash
+                        break
+                    offset += len(line)
+                    end = (first_seq, offset)
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        continue
+                    if record['seq'] > acked:
+                        records.append(record)
+                        if len(records) >= self.batch_size:
+                            return records, end
+        return records, end
+
+    def _acknowledge(self, seq, cursor):
+        self.acked = seq
+        self._cursor = cursor
+        tmp_path = self._ack_path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            f.write(str(seq))
+        os.replace(tmp_path, self._ack_path)
+        # Drop segments that lie entirely before the cursor
+        for first_seq, path in self._segments():
+            if first_seq < cursor[0]:
+                os.remove(path)
+
+    def _upload(self, records):
+        import requests
+
+        body = gzip.compress(json.dumps({
+            'device': self.device_id,
+            'records': records,
+        }, separators=(',', ':')).encode('utf-8'))
+        response = requests.post(
+            self.collector_url,
+            data=body,
+            headers={
+                'Content-Type': 'application/json',
+                'Content-Encoding': 'gzip',
+            },
+            timeout=UPLOAD_TIMEOUT
+        )
+        response.raise_for_status()
+
+    def _due(self):
+        if not self.pending():
+            return False
+        if self.pending() >= self.batch_size:
+            return True
+        return self._oldest_pending is not None and time.monotonic() - self._oldest_pending >= self.max_batch_age
+
+    def flush(self):
+        """Upload everything pending now; returns False if an upload failed"""
+        while self.pending():
+            records, cursor = self._read_batch()
+            if not records:
+                return True
+            try:
+                self._upload(records)
+            except Exception as e:
+                self.log(f"Result upload failed ({self.pending()} pending): {e}")
+                return False
+            with self._lock:
+                self._acknowledge(records[-1]['seq'], cursor)
+                self._oldest_pending = time.monotonic() if self.pending() else None
+        return True
+
+    def _run(self):
+        retry_delay = MIN_RETRY_DELAY
+        while not self._stopped:
+            if not self._due():
+                self._wakeup.wait(self.max_batch_age)
+                self._wakeup.clear()
+                continue
+            if self.flush():
+                retry_delay = MIN_RETRY_DELAY
+            else:
+                self._wakeup.wait(retry_delay)
+                self._wakeup.clear()
+                retry_delay = min(retry_delay * 2, MAX_RETRY_DELAY)
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name='result-upload', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stopped = True
+        self._wakeup.set()
+        if self._thread is not None:
+            self._thread.join(timeout=UPLOAD_TIMEOUT)
+        with self._lock:
+            if self._segment is not None:
+                self._segment.close()
+                self._segment = None
@@ -0,0 +1,267 @@
+"""
+When the probe loop wakes up, and how long endpoints wait between probes.
+
+The default continuous mode probes every endpoint exactly when it falls
+due. The aligned and battery modes trade a little timing precision for
+fewer wakeups:
+
+- aligned: probes snap to a shared grid of `window` seconds, so endpoints
+  that fall due close together go out in one radio wakeup. On Android the
+  wakeup is also registered as an inexact AlarmManager window, which the OS
+  batches with other apps' alarms and honours in Doze; the alarm's
+  broadcast sets the probe loop's wakeup event, and the schedule runs on
+  CLOCK_BOOTTIME so time spent suspended counts towards the next probe.
+  Where the broadcast receiver cannot be registered, alignment is only the
+  in-process grid.
+- battery: aligned, and intervals are stretched while the battery is low
+  (and not charging), power saving is on, or the device is in Doze.
+
+The decisions only depend on the clock, power monitor and alarm passed in,
+so they can be exercised off-device with fakes (see tests/).
+"""
+import math
+import time
+
+from services.platform_shims import is_android
+
+MODE_CONTINUOUS = 'continuous'
+MODE_ALIGNED = 'aligned'
+MODE_BATTERY = 'battery'
+WAKE_MODES = (MODE_CONTINUOUS, MODE_ALIGNED, MODE_BATTERY)
+
+DEFAULT_WINDOW = 30
+LOW_BATTERY_LEVEL = 20
+LOW_BATTERY_STRETCH = 2
+DOZE_STRETCH = 4
+POWER_CHECK_INTERVAL = 60
+# How long the CPU is kept awake after a wake alarm, for the probe batch
+WAKE_HOLD = 30
+WAKE_ACTION = 'org.kivy.android.PROBE_WAKE'
+
+
+def boot_clock():
+    """
+    Seconds since boot including time suspended (CLOCK_BOOTTIME); falls back
+    to time.monotonic() where that clock does not exist
+    """
+    clock_id = getattr(time, 'CLOCK_BOOTTIME', None)
+    if clock_id is None:
+        return time.monotonic()
+    return time.clock_gettime(clock_id)
+
+
+class PowerState:
+    """Battery level (percent) and power-related device modes"""
+
+    def __init__(self, level=100, charging=True, idle=False, power_save=False):
+        self.level = level
+        self.charging = charging
+        self.idle = idle
+        self.power_save = power_save
+
+    def __repr__(self):
+        return (f"PowerState(level={self.level}, charging={self.charging}, "
+                f"idle={self.idle}, power_save={self.power_save})")
+
+
+class PowerMonitor:
+    """Desktop stand-in: always on mains power"""
+
+    def read(self):
+        return PowerState()
+
+
+class AndroidPowerMonitor(PowerMonitor):
+    """Battery and Doze state from BatteryManager / PowerManager, via pyjnius"""
+
+    def __init__(self):
+        self._battery = None
+        self._power = None
+        self._capacity = None
+
+    def _resolve(self):
+        from jnius import autoclass
+        Context = autoclass('android.content.Context')
+        BatteryManager = autoclass('android.os.BatteryManager')
+        service = autoclass('org.kivy.android.PythonService').mService
+        self._battery = service.getSystemService(Context.BATTERY_SERVICE)
+        self._power = service.getSystemService(Context.POWER_SERVICE)
+        self._capacity = BatteryManager.BATTERY_PROPERTY_CAPACITY
+
+    def read(self):
+        try:
+            if self._battery is None:
+                self._resolve()
+            return PowerState(
+                level=self._battery.getIntProperty(self._capacity),
+                charging=self._battery.isCharging(),
+                idle=self._power.isDeviceIdleMode(),
+                power_save=self._power.isPowerSaveMode()
+            )
+        except Exception as e:
+            print(f"Error reading power state: {e}")
+            return PowerState()
+
+
+class AndroidAlarm:
+    """
+    Inexact AlarmManager wakeup delivered back into the probe loop.
+
+    setWindow() lets Android move the alarm anywhere inside the window to
+    batch it with other wakeups. The alarm fires a broadcast that this
+    process receives through python-for-android's BroadcastReceiver; the
+    receiver holds a partial wake lock for WAKE_HOLD seconds and calls the
+    callback given to start(), which wakes the asyncio loop.
+    """
+
+    def __init__(self):
+        self._manager = None
+        self._pending = None
+        self._receiver = None
+        self._wake_lock = None
+        self._callback = None
+
+    def _resolve(self):
+        from jnius import autoclass
+        Context = autoclass('android.content.Context')
+        Intent = autoclass('android.content.Intent')
+        PendingIntent = autoclass('android.app.PendingIntent')
+        PowerManager = autoclass('android.os.PowerManager')
+        self.AlarmManager = autoclass('android.app.AlarmManager')
+        self.SystemClock = autoclass('android.os.SystemClock')
+        service = autoclass('org.kivy.android.PythonService').mService
+        intent = Intent(WAKE_ACTION)
+        intent.setPackage(service.getPackageName())
+        self._pending = PendingIntent.getBroadcast(
+            service, 0, intent,
+            PendingIntent.FLAG_UPDATE_CURRENT | PendingIntent.FLAG_IMMUTABLE
+        )
+        self._manager = service.getSystemService(Context.ALARM_SERVICE)
+        power = service.getSystemService(Context.POWER_SERVICE)
+        self._wake_lock = power.newWakeLock(PowerManager.PARTIAL_WAKE_LOCK, 'pinger:probe-wake')
+        self._wake_lock.setReferenceCounted(False)
+
+    def _on_receive(self, context, intent):
+        self._wake_lock.acquire(WAKE_HOLD * 1000)
+        if self._callback is not None:
+            self._callback()
+
+    def start(self, callback):
+        """Call `callback` (from a Java thread) whenever the alarm fires"""
+        self._callback = callback
+        if self._receiver is not None:
+            return
+        try:
+            if self._manager is None:
+                self._resolve()
+            from android.broadcast import BroadcastReceiver
+            self._receiver = BroadcastReceiver(self._on_receive, actions=[WAKE_ACTION])
+            self._receiver.start()
+        except Exception as e:
+            print(f"Wake alarms unavailable, aligning in-process only: {e}")
+
+    def schedule(self, delay, window):
+        try:
+            if self._manager is None:
+                self._resolve()
+            self._manager.setWindow(
+                self.AlarmManager.ELAPSED_REALTIME_WAKEUP,
+                self.SystemClock.elapsedRealtime() + int(delay * 1000),
+                int(window * 1000),
+                self._pending
+            )
+        except Exception as e:
+            print(f"Error scheduling wake alarm: {e}")
+
+
+class WakePolicy:
+    """
+    Decides when the probe loop wakes and stretches probe intervals.
+
+    In the aligned modes an endpoint due at time t is probed in the grid
+    slot nearest to t, i.e. up to window/2 early or late, so intervals are
+    kept on average while every endpoint due around a slot shares its
+    wakeup. Intervals are at least one window long in these modes, so a
+    rescheduled endpoint never lands back in the slot it just ran in.
+    """
+
+    def __init__(self, mode=MODE_CONTINUOUS, window=DEFAULT_WINDOW, power=None, alarm=None,
+                 clock=time.monotonic):
+        if mode not in WAKE_MODES:
+            raise ValueError(f"Wake mode must be one of {', '.join(WAKE_MODES)}")
+        self.mode = mode
+        self.window = window
+        self.power = power or PowerMonitor()
+        self.alarm = alarm
+        self.clock = clock
+        self._power_state = None
+        self._power_checked = None
+        self._alarm_at = None
+
+    def bind(self, wake):
+        """
+        Have alarms call `wake` (thread-safe) to wake the probe loop. The
+        loop's scheduler must run on this policy's clock.
+        """
+        if self.alarm is not None and self.aligned:
+            self.alarm.start(wake)
+
+    @property
+    def aligned(self):
+        return self.mode != MODE_CONTINUOUS
+
+    def power_state(self):
+        """Current PowerState, re-read at most every POWER_CHECK_INTERVAL seconds"""
+        now = self.clock()
+        if self._power_checked is None or now - self._power_checked >= POWER_CHECK_INTERVAL:
+            self._power_state = self.power.read()
+            self._power_checked = now
+        return self._power_state
+
+    def stretch(self):
+        """Factor applied to probe intervals"""
+        if self.mode != MODE_BATTERY:
+            return 1
+        state = self.power_state()
+        if state.idle:
+            return DOZE_STRETCH
+        if state.power_save or (state.level <= LOW_BATTERY_LEVEL and not state.charging):
+            return LOW_BATTERY_STRETCH
+        return 1
+
+    def interval(self, interval):
+        interval *= self.stretch()
+        if self.aligned:
+            interval = max(interval, self.window)
+        return interval
+
+    def slot(self, due):
+        """Wake time for a probe due at `due`"""
+        if not self.aligned:
+            return due
+        return math.floor(due / self.window + 0.5) * self.window
+
+    def cutoff(self, now):
+        """Probes due up to this time are run when waking at `now`"""
+        if not self.aligned:
+            return now
+        # Everything whose nearest slot has been reached
+        return math.floor(now / self.window) * self.window + self.window / 2
+
+    def delay(self, next_due, now):
+        """Seconds to sleep before the next wakeup; None when nothing is scheduled"""
+        if next_due is None:
+            return None
+        wake = self.slot(next_due)
+        delay = max(0.0, wake - now)
+        if self.alarm is not None and self.aligned and delay > 0 and wake != self._alarm_at:
+            self._alarm_at = wake
+            self.alarm.schedule(delay, self.window)
+        return delay
+
+
+def create_policy(mode=MODE_CONTINUOUS, window=DEFAULT_WINDOW):
+    """WakePolicy for `mode` with the platform's power monitor and alarms"""
+    if is_android():
+        return WakePolicy(mode, window, power=AndroidPowerMonitor(), alarm=AndroidAlarm(), clock=boot_clock)
+    return WakePolicy(mode, window)
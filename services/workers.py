@@ -0,0 +1,212 @@
+import asyncio
+import multiprocessing
+import os
+import time
+import zlib
+from multiprocessing.connection import wait
+
+from services.config import reconcile
+from services.endpoint_state import HealthTracker
+from services.http_pool import SessionPool
+from services.log_writer import BatchWriter
+from services.probe_engine import DEFAULT_CONCURRENCY, ProbeEngine, ProbeResult
+from services.scheduler import EndpointScheduler
+
+RESULT_FLUSH_INTERVAL = 0.05
+RESULT_BATCH_SIZE = 200
+CONTROL_CHECK_INTERVAL = 1.0
+RESTART_DELAY = 1.0
+
+
+def shard_for(url, shards):
+    """Stable shard index of an endpoint, the same in every process and run"""
+    return zlib.crc32(url.encode('utf-8')) % shards
+
+
+def _worker_main(endpoints, concurrency, result_conn, control_conn):
+    """
+    Entry point of a worker process: probe one shard of the endpoints and
+    stream results back to the parent in batches.
+    """
+    engine = ProbeEngine(concurrency=concurrency, pool=SessionPool(pool_size=concurrency))
+    tracker = HealthTracker()
+    scheduler = EndpointScheduler()
+    scheduler.add_spread(endpoints)
+
+    def send_results(batch):
+        try:
+            result_conn.send(batch)
+        except OSError:
+            # The parent is gone; there is nobody left to deliver to
+            pass
+
+    results = BatchWriter(
+        send_results,
+        flush_interval=RESULT_FLUSH_INTERVAL,
+        max_pending=RESULT_BATCH_SIZE
+    )
+
+    def on_result(result):
+        results.write(result.to_record())
+
+    def check_control():
+        nonlocal endpoints
+        while True:
+            try:
+                if not control_conn.poll():
+                    return
+                command, payload = control_conn.recv()
+            except (EOFError, OSError):
+                # The parent exited without saying stop; do it for it
+                command, payload = 'stop', None
+            if command == 'endpoints':
+                endpoints, _ = reconcile(scheduler, endpoints, payload, tracker)
+            elif command == 'stop':
+                raise SystemExit(0)
+
+    try:
+        asyncio.run(engine.run_forever(
+            scheduler,
+            on_result,
+            tracker,
+            housekeeping=check_control,
+            housekeeping_interval=CONTROL_CHECK_INTERVAL
+        ))
+    finally:
+        results.close()
+
+
+class _Worker:
+    def __init__(self, index):
+        self.index = index
+        self.endpoints = []
+        self.process = None
+        self.result_conn = None
+        self.control_conn = None
+        self.restarts = 0
+
+
+class WorkerPool:
+    """
+    Shards endpoints across worker processes, each running its own
+    ProbeEngine, scheduler and health tracker.
+
+    Endpoints are assigned to workers by a stable hash of their URL, so a
+    config reload only touches the shards whose endpoints changed. Results
+    come back over one pipe per worker, in batches, and are merged into a
+    single stream on the parent. A worker that dies is restarted with its
+    shard; the other workers keep running with their schedules intact.
+    """
+
+    def __init__(self, endpoints, workers=None, concurrency=DEFAULT_CONCURRENCY, log=print):
+        self.size = workers or os.cpu_count() or 1
+        self.concurrency = concurrency
+        self.log = log
+        self._context = multiprocessing.get_context('spawn')
+        self._workers = [_Worker(i) for i in range(self.size)]
+        self._endpoints = {}
+        self._assign(endpoints)
+
+    def _assign(self, endpoints):
+        self._endpoints = {e.url: e for e in endpoints}
+        shards = [[] for _ in range(self.size)]
+        for endpoint in endpoints:
+            shards[shard_for(endpoint.url, self.size)].append(endpoint)
+        return shards
+
+    def _start(self, worker):
+        parent_results, child_results = self._context.Pipe(duplex=False)
+        child_control, parent_control = self._context.Pipe(duplex=False)
+        worker.process = self._context.Process(
+            target=_worker_main,
+            args=(worker.endpoints, self.concurrency, child_results, child_control),
+            name=f'probe-worker-{worker.index}',
+            daemon=True
+        )
+        worker.process.start()
+        child_results.close()
+        child_control.close()
+        worker.result_conn = parent_results
+        worker.control_conn = parent_control
+
+    def start(self):
+        for worker, shard in zip(self._workers, self._assign(list(self._endpoints.values()))):
+            worker.endpoints = shard
+            self._start(worker)
+
+    def update(self, endpoints):
+        """Send a reloaded endpoint list to the workers whose shard changed"""
+        for worker, shard in zip(self._workers, self._assign(endpoints)):
+            if [e.settings() for e in shard] != [e.settings() for e in worker.endpoints]:
+                worker.endpoints = shard
+                try:
+                    worker.control_conn.send(('endpoints', shard))
+                except OSError:
+                    # The worker is gone; it gets the new shard on restart
+                    pass
+
+    def _deliver(self, worker, on_result):
+        try:
+            batch = worker.result_conn.recv()
+        except (EOFError, OSError):
+            return False
+        for record in batch:
+            endpoint = self._endpoints.get(record[0])
+            if endpoint is not None:
+                on_result(ProbeResult.from_record(endpoint, record))
+        return True
+
+    def _restart(self, worker, on_result):
+        # Drain whatever the worker managed to send before it died
+        while worker.result_conn.poll() and self._deliver(worker, on_result):
+            pass
+        worker.process.join()
+        self.log(f"Probe worker {worker.index} exited with code {worker.process.exitcode}, restarting")
+        worker.result_conn.close()
+        worker.control_conn.close()
+        worker.restarts += 1
+        time.sleep(RESTART_DELAY)
+        self._start(worker)
+
+    def run_forever(self, on_result, housekeeping=None, housekeeping_interval=5.0):
+        """
+        Supervise the workers and pass every result to `on_result` on the
+        calling thread. Blocks until stop() is called from `housekeeping`
+        or another thread.
+        """
+        self._running = True
+        last_housekeeping = time.monotonic()
+        while self._running:
+            by_handle = {}
+            for worker in self._workers:
+                by_handle[worker.result_conn] = ('results', worker)
+                by_handle[worker.process.sentinel] = ('exited', worker)
+            for handle in wait(list(by_handle), timeout=housekeeping_interval):
+                kind, worker = by_handle[handle]
+                if kind == 'results':
+                    self._deliver(worker, on_result)
+                elif not worker.process.is_alive():
+                    self._restart(worker, on_result)
+
+            if housekeeping is not None and time.monotonic() - last_housekeeping >= housekeeping_interval:
+                housekeeping()
+                last_housekeeping = time.monotonic()
+
+    def stop(self):
+        self._running = False
+        for worker in self._workers:
+            try:
+                worker.control_conn.send(('stop', None))
+            except OSError:
+                pass
+        for worker in self._workers:
+            worker.process.join(timeout=5)
+            if worker.process.is_alive():
+                worker.process.terminate()
+
+    def stats(self):
+        return {
+            'workers': self.size,
+            'endpoints': [len(w.endpoints) for w in self._workers],
+            'restarts': [w.restarts for w in self._workers],
+        }
@@ -0,0 +1,34 @@
+import random
+
+from services.config import reconcile
+from services.endpoint_state import HealthTracker
+from services.probe_engine import Endpoint, ProbeResult
+from services.scheduler import EndpointScheduler
+
+
+def test_reconcile_keeps_unchanged_endpoints():
+    scheduler = EndpointScheduler(clock=lambda: 0.0, rng=random.Random(1))
+    tracker = HealthTracker()
+    kept, changed, removed = Endpoint('https://kept'), Endpoint('https://changed'), Endpoint('https://removed')
+    current = [kept, changed, removed]
+    for endpoint in current:
+        scheduler.add(endpoint, 100)
+    tracker.observe(ProbeResult(removed, False, status_code=500))
+
+    new = [
+        Endpoint('https://kept'),
+        Endpoint('https://changed', interval=5),
+        Endpoint('https://added'),
+    ]
+    endpoints, summary = reconcile(scheduler, current, new, tracker)
+
+    assert summary == "1 added, 1 changed, 1 removed"
+    assert endpoints[0] is kept
+    assert endpoints[1] is new[1]
+    assert endpoints[2] is new[2]
+    assert removed not in scheduler and changed not in scheduler
+    assert len(scheduler) == 3
+    # The changed endpoint is probed right away, the added one spread out
+    assert scheduler.pop_due(0) == [new[1], new[2]]
+    # Health state of the removed endpoint was forgotten
+    assert tracker.observe(ProbeResult(removed, True, status_code=200)).old is None
@@ -0,0 +1,78 @@
+import socket
+import threading
+
+import pytest
+
+from services.dns_cache import DNSCache, MIN_TTL
+
+
+class FakeClock:
+    def __init__(self, now=0.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+class FakeLookup:
+    def __init__(self, ttl=100):
+        self.ttl = ttl
+        self.calls = 0
+        self.fail = False
+        self.refreshed = threading.Event()
+
+    def __call__(self, host):
+        self.calls += 1
+        self.refreshed.set()
+        if self.fail:
+            raise socket.gaierror(socket.EAI_AGAIN, "resolver down")
+        return [f"10.0.0.{self.calls}"], self.ttl
+
+
+def make_cache(ttl=100):
+    clock, lookup = FakeClock(), FakeLookup(ttl)
+    return DNSCache(lookup=lookup, clock=clock), clock, lookup
+
+
+def test_entries_live_for_the_record_ttl():
+    cache, clock, lookup = make_cache(ttl=100)
+    assert cache.resolve('a.example') == ['10.0.0.1']
+    clock.now = 79
+    assert cache.resolve('a.example') == ['10.0.0.1']
+    assert lookup.calls == 1
+    clock.now = 101
+    assert cache.resolve('a.example') == ['10.0.0.2']
+    assert cache.stats()['hits'] == 1
+    cache.close()
+
+
+def test_ttl_is_clamped():
+    cache, clock, lookup = make_cache(ttl=0)
+    cache.resolve('a.example')
+    # Still cached, and not yet due for a refresh
+    clock.now = MIN_TTL * 0.5
+    cache.resolve('a.example')
+    assert lookup.calls == 1
+    cache.close()
+
+
+def test_refresh_ahead_serves_cached_addresses():
+    cache, clock, lookup = make_cache(ttl=100)
+    cache.resolve('a.example')
+    lookup.refreshed.clear()
+    clock.now = 85
+    assert cache.resolve('a.example') == ['10.0.0.1']
+    assert lookup.refreshed.wait(5)
+    cache.close()
+    assert cache.stats()['refreshes'] == 1
+
+
+def test_stale_addresses_are_kept_when_the_resolver_fails():
+    cache, clock, lookup = make_cache(ttl=100)
+    cache.resolve('a.example')
+    lookup.fail = True
+    clock.now = 200
+    assert cache.resolve('a.example') == ['10.0.0.1']
+    with pytest.raises(socket.gaierror):
+        cache.resolve('b.example')
+    cache.close()
@@ -0,0 +1,48 @@
+from services.endpoint_state import HealthTracker, UP, DEGRADED, DOWN
+from services.probe_engine import Endpoint, ProbeResult
+
+
+def fail(tracker, endpoint, times=1):
+    for _ in range(times):
+        transition = tracker.observe(ProbeResult(endpoint, False, status_code=503))
+    return transition
+
+
+def test_transitions_are_only_reported_on_change():
+    tracker = HealthTracker(down_after=3)
+    endpoint = Endpoint('https://a')
+    assert tracker.observe(ProbeResult(endpoint, True, status_code=200)).new == UP
+    assert tracker.observe(ProbeResult(endpoint, True, status_code=200)) is None
+    assert fail(tracker, endpoint).new == DEGRADED
+    assert fail(tracker, endpoint) is None
+    transition = fail(tracker, endpoint)
+    assert (transition.old, transition.new, transition.failures) == (DEGRADED, DOWN, 3)
+    transition = tracker.observe(ProbeResult(endpoint, True, status_code=200))
+    assert (transition.old, transition.new) == (DOWN, UP)
+
+
+def test_down_endpoints_back_off_up_to_the_cap():
+    tracker = HealthTracker(down_after=1, retry_interval=10, max_backoff=600)
+    endpoint = Endpoint('https://a', interval=60)
+    fail(tracker, endpoint)
+    assert tracker.interval_for(endpoint) == 120
+    fail(tracker, endpoint, 2)
+    assert tracker.interval_for(endpoint) == 480
+    fail(tracker, endpoint, 20)
+    assert tracker.interval_for(endpoint) == 600
+
+
+def test_backoff_never_probes_more_often_than_healthy():
+    tracker = HealthTracker(down_after=1, max_backoff=600)
+    endpoint = Endpoint('https://a', interval=3600)
+    fail(tracker, endpoint)
+    assert tracker.interval_for(endpoint) == 3600
+    fail(tracker, endpoint, 20)
+    assert tracker.interval_for(endpoint) == 3600
+
+
+def test_degraded_endpoints_are_rechecked_soon():
+    tracker = HealthTracker(down_after=3, retry_interval=10)
+    endpoint = Endpoint('https://a', interval=60)
+    fail(tracker, endpoint)
+    assert tracker.interval_for(endpoint) == 10
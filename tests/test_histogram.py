@@ -0,0 +1,44 @@
+import random
+
+import pytest
+
+from services.histogram import LatencyHistogram, MAX_LATENCY_MS, DEFAULT_PRECISION
+
+
+def test_empty_histogram():
+    histogram = LatencyHistogram()
+    assert histogram.percentile(50) is None
+    assert histogram.mean() is None
+
+
+def test_percentiles_within_precision():
+    rng = random.Random(7)
+    values = sorted(rng.lognormvariate(4, 1) for _ in range(10000))
+    histogram = LatencyHistogram()
+    for value in values:
+        histogram.record(value)
+    for q in (50, 95, 99):
+        exact = values[int(q / 100 * (len(values) - 1))]
+        assert histogram.percentile(q) == pytest.approx(exact, rel=DEFAULT_PRECISION * 1.5)
+    assert histogram.min == values[0]
+    assert histogram.max == values[-1]
+
+
+def test_values_are_clamped():
+    histogram = LatencyHistogram()
+    histogram.record(0)
+    histogram.record(MAX_LATENCY_MS * 10)
+    assert histogram.max == MAX_LATENCY_MS
+    assert histogram.percentile(100) == pytest.approx(MAX_LATENCY_MS, rel=DEFAULT_PRECISION)
+
+
+def test_merge_matches_recording_everything():
+    a, b, both = LatencyHistogram(), LatencyHistogram(), LatencyHistogram()
+    for i in range(1, 500):
+        (a if i % 2 else b).record(i)
+        both.record(i)
+    a.merge(b)
+    assert a.count == both.count
+    assert a.percentiles() == both.percentiles()
+    with pytest.raises(ValueError):
+        a.merge(LatencyHistogram(precision=0.05))
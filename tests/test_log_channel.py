@@ -0,0 +1,48 @@
+import os
+
+from services.log_channel import FRAME, LogReader, LogWriter
+
+
+def test_reader_only_returns_new_complete_records(tmp_path):
+    path = str(tmp_path / 'log.bin')
+    writer, reader = LogWriter(path), LogReader(path)
+    assert reader.read_new() == []
+    writer.append_many([b'one', b'two\nwith newline'])
+    assert reader.read_new() == [b'one', b'two\nwith newline']
+    assert reader.read_new() == []
+
+    # A record whose write is still in progress
+    with open(path, 'ab') as f:
+        f.write(FRAME.pack(5) + b'thr')
+    assert reader.read_new() == []
+    with open(path, 'ab') as f:
+        f.write(b'ee')
+    assert reader.read_new() == [b'three']
+    writer.close()
+    reader.close()
+
+
+def test_reader_follows_rotation(tmp_path):
+    path = str(tmp_path / 'log.bin')
+    writer, reader = LogWriter(path, max_bytes=100), LogReader(path)
+    records = [b'%03d' % i + b'x' * 20 for i in range(20)]
+    read = []
+    for record in records:
+        writer.append(record)
+        read.extend(reader.read_new())
+    assert os.path.exists(path + '.1')
+    assert read == records
+    writer.close()
+    reader.close()
+
+
+def test_reader_drains_old_file_before_switching(tmp_path):
+    path = str(tmp_path / 'log.bin')
+    writer, reader = LogWriter(path, max_bytes=64), LogReader(path)
+    writer.append(b'a' * 10)
+    assert reader.read_new() == [b'a' * 10]
+    writer.append(b'b' * 60)  # rotates
+    writer.append(b'c' * 10)
+    assert reader.read_new() == [b'b' * 60, b'c' * 10]
+    writer.close()
+    reader.close()
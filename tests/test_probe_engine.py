@@ -0,0 +1,64 @@
+import asyncio
+import time
+
+import pytest
+
+from benchmarks.standin import start_in_thread
+from services.http_pool import SessionPool
+from services.probe_engine import Endpoint, ProbeEngine
+from services.scheduler import EndpointScheduler
+
+ENDPOINT_COUNT = 100
+DELAY = 2.0
+
+
+@pytest.fixture
+def slow_server():
+    server, port = start_in_thread(delay=DELAY)
+    yield port
+    server.shutdown()
+
+
+def test_cycle_takes_one_delay_not_the_sum(slow_server):
+    endpoints = [
+        Endpoint(f"http://127.0.0.1:{slow_server}/health/{i}", timeout=10)
+        for i in range(ENDPOINT_COUNT)
+    ]
+    engine = ProbeEngine(concurrency=ENDPOINT_COUNT, pool=SessionPool(pool_size=ENDPOINT_COUNT))
+    try:
+        start = time.perf_counter()
+        results = engine.run_cycle(endpoints)
+        elapsed = time.perf_counter() - start
+    finally:
+        engine.close()
+
+    assert [r.ok for r in results] == [True] * ENDPOINT_COUNT
+    assert elapsed < DELAY * 1.5
+
+
+def test_stop_ends_run_forever_under_load():
+    server, port = start_in_thread()
+    endpoints = [
+        Endpoint(f"http://127.0.0.1:{port}/health/{i}", timeout=10, interval=0.05, jitter=0)
+        for i in range(200)
+    ]
+    scheduler = EndpointScheduler()
+    scheduler.add_spread(endpoints)
+    engine = ProbeEngine(concurrency=50, pool=SessionPool(pool_size=50))
+    results = []
+    start = time.perf_counter()
+
+    def housekeeping():
+        if time.perf_counter() - start >= 1:
+            engine.stop()
+
+    try:
+        asyncio.run(asyncio.wait_for(
+            engine.run_forever(scheduler, results.append, housekeeping=housekeeping, housekeeping_interval=0.2),
+            10
+        ))
+    finally:
+        engine.close()
+        server.shutdown()
+    assert results
+    assert time.perf_counter() - start < 3
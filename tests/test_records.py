@@ -0,0 +1,64 @@
+from services.endpoint_state import Transition, UP, DEGRADED, DOWN
+from services.probe_engine import Endpoint, ProbeResult
+from services.records import (
+    decode, encode, format_record, message_record, probe_record, transition_record,
+    KIND_MESSAGE, STATUS_ERROR, STATUS_FAILED,
+)
+
+
+def make_result(ok=True, status_code=200, latency=0.125, error=None):
+    result = ProbeResult(Endpoint('https://example.com/health'), ok, status_code, latency, error)
+    result.timestamp = 1700000000.0
+    return result
+
+
+def test_message_round_trip():
+    record = message_record("Service started: ünïcode", success=False)
+    decoded = decode(encode(record))
+    assert decoded == record
+    assert decoded.kind == KIND_MESSAGE
+    assert decoded.status == STATUS_FAILED
+    assert format_record(decoded) == "Service started: ünïcode"
+
+
+def test_probe_round_trip():
+    result = make_result()
+    decoded = decode(encode(probe_record(result, UP)))
+    assert decoded.url == 'https://example.com/health'
+    assert decoded.code == 200
+    assert decoded.state == UP
+    assert abs(decoded.latency_ms - 125.0) < 1e-3
+    assert format_record(decoded) == "[2023-11-14 22:13:20] ✓ Successfully pinged https://example.com/health: 200"
+
+
+def test_failed_probe_has_no_latency():
+    result = make_result(ok=False, status_code=None, latency=30.0, error=TimeoutError("timed out"))
+    decoded = decode(encode(probe_record(result, DEGRADED)))
+    assert decoded.latency_ms is None
+    assert decoded.code is None
+    assert decoded.status == STATUS_ERROR
+
+
+def test_transition_keeps_error_text():
+    result = make_result(ok=False, status_code=None, latency=30.0, error=TimeoutError("timed out"))
+    decoded = decode(encode(transition_record(result, Transition(result.endpoint, UP, DEGRADED, 1))))
+    assert decoded.detail == "timed out"
+    assert format_record(decoded).endswith(
+        "✗ Error pinging https://example.com/health: timed out (degraded, re-checking)"
+    )
+
+
+def test_transition_text():
+    result = make_result(ok=False, status_code=503)
+    down = transition_record(result, Transition(result.endpoint, DEGRADED, DOWN, 3))
+    assert format_record(decode(encode(down))).endswith(
+        "⚠ Ping failed for https://example.com/health: 503 (down after 3 failed probes, backing off)"
+    )
+    recovered = transition_record(make_result(), Transition(result.endpoint, DOWN, UP, 3))
+    assert format_record(decode(encode(recovered))).endswith("(recovered after 3 failed probes)")
+
+
+def test_failure_count_is_clamped():
+    result = make_result(ok=False, status_code=503)
+    record = transition_record(result, Transition(result.endpoint, DOWN, DOWN, 100000))
+    assert decode(encode(record)).failures == 0xFFFF
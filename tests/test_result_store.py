@@ -0,0 +1,89 @@
+import os
+import time
+
+from services.probe_engine import Endpoint, ProbeResult
+from services.result_store import HOUR, MINUTE, ROLLUP, ResultStore
+
+# 2024-01-31 22:00 UTC, so the hours below cross a month boundary
+START = 1706738400
+
+
+def probe(url, timestamp, ok=True, latency=0.05):
+    if ok:
+        result = ProbeResult(Endpoint(url), True, status_code=200, latency=latency)
+    else:
+        result = ProbeResult(Endpoint(url), False, latency=latency, error=TimeoutError("timed out"))
+    result.timestamp = timestamp
+    return result
+
+
+def test_failures_do_not_skew_latency_percentiles(tmp_path):
+    store = ResultStore(str(tmp_path), retention_days=100000)
+    for i in range(10):
+        store.record(probe('https://a', START + i))
+    store.record(probe('https://a', START + 10, ok=False, latency=30.0))
+    store.record(probe('https://a', START + 11, ok=False, latency=None))
+
+    rollup, = store.rollups('https://a', START, START + MINUTE, resolution=MINUTE)
+    assert (rollup.count, rollup.failures) == (12, 2)
+    assert abs(rollup.p95 - 50) < 1.5
+    store.close()
+
+
+def test_hour_rollups_are_kept_per_endpoint_and_month(tmp_path):
+    store = ResultStore(str(tmp_path), retention_days=100000, hour_retention_days=100000)
+    for hour in range(4):
+        for url in ('https://a', 'https://b'):
+            store.record(probe(url, START + hour * HOUR))
+    a_id = store.endpoint_id('https://a')
+
+    hour_files = sorted(n for n in os.listdir(tmp_path) if n.startswith('hour-'))
+    assert hour_files == ['hour-202401-0.bin', 'hour-202401-1.bin', 'hour-202402-0.bin', 'hour-202402-1.bin']
+    assert os.path.getsize(tmp_path / f'hour-202402-{a_id}.bin') == ROLLUP.size
+
+    rollups = store.rollups('https://a', START, START + 4 * HOUR)
+    assert [r.start for r in rollups] == [START + h * HOUR for h in range(4)]
+    assert all(r.endpoint_id == a_id and r.count == 1 for r in rollups)
+    store.close()
+
+
+def test_open_buckets_survive_a_restart(tmp_path):
+    store = ResultStore(str(tmp_path), retention_days=100000)
+    for i in range(30):
+        store.record(probe('https://a', START + i * 10))
+    store.close()
+
+    store = ResultStore(str(tmp_path), retention_days=100000)
+    rollup, = store.rollups('https://a', START, START + HOUR)
+    assert rollup.count == 30
+    store.close()
+
+
+def test_legacy_hour_file_is_split(tmp_path):
+    with open(tmp_path / 'hour.bin', 'wb') as f:
+        f.write(ROLLUP.pack(START, 0, 5, 1, 10.0, 20.0, 30.0))
+        f.write(ROLLUP.pack(START, 1, 7, 0, 11.0, 21.0, 31.0))
+        f.write(ROLLUP.pack(START + 2 * HOUR, 0, 3, 0, 12.0, 22.0, 32.0))
+    with open(tmp_path / 'endpoints.jsonl', 'w') as f:
+        f.write('"https://a"\n"https://b"\n')
+
+    store = ResultStore(str(tmp_path), retention_days=100000, hour_retention_days=100000)
+    assert not os.path.exists(tmp_path / 'hour.bin')
+    assert [r.count for r in store.rollups('https://a', START, START + 3 * HOUR)] == [5, 3]
+    assert [r.count for r in store.rollups('https://b', START, START + 3 * HOUR)] == [7]
+    store.close()
+
+
+def test_old_files_are_pruned(tmp_path):
+    now = time.time()
+    old_day = time.strftime('%Y%m%d', time.gmtime(now - 40 * 86400))
+    old_month = time.strftime('%Y%m', time.gmtime(now - 400 * 86400))
+    recent_month = time.strftime('%Y%m', time.gmtime(now - 40 * 86400))
+    names = [f'raw-{old_day}.bin', f'minute-{old_day}.bin', f'hour-{old_month}-0.bin', f'hour-{recent_month}-0.bin']
+    for name in names:
+        (tmp_path / name).write_bytes(b'')
+
+    store = ResultStore(str(tmp_path), retention_days=30, hour_retention_days=365)
+    store.record(probe('https://a', now))
+    store.close()
+    assert sorted(n for n in os.listdir(tmp_path) if n in names) == [f'hour-{recent_month}-0.bin']
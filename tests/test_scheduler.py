@@ -0,0 +1,74 @@
+import random
+
+from services.probe_engine import Endpoint
+from services.scheduler import EndpointScheduler
+
+
+class FakeClock:
+    def __init__(self, now=0.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+def make_scheduler():
+    clock = FakeClock()
+    return EndpointScheduler(clock=clock, rng=random.Random(1)), clock
+
+
+def test_pop_due_returns_endpoints_in_due_order():
+    scheduler, clock = make_scheduler()
+    a, b, c = Endpoint('https://a', jitter=0), Endpoint('https://b', jitter=0), Endpoint('https://c', jitter=0)
+    scheduler.add(b, 2)
+    scheduler.add(a, 1)
+    scheduler.add(c, 5)
+    assert scheduler.next_due() == 1
+    assert scheduler.pop_due(3) == [a, b]
+    assert scheduler.pop_due(3) == []
+    assert scheduler.next_due() == 5
+    assert len(scheduler) == 3
+
+
+def test_reschedule_adds_interval_and_jitter():
+    scheduler, clock = make_scheduler()
+    endpoint = Endpoint('https://a', interval=60, jitter=5)
+    scheduler.add(endpoint)
+    assert scheduler.pop_due() == [endpoint]
+    scheduler.reschedule(endpoint, now=10)
+    assert 70 <= scheduler.next_due() <= 75
+    scheduler.reschedule(endpoint, now=10, interval=300)
+    assert 310 <= scheduler.next_due() <= 315
+
+
+def test_removed_endpoints_are_not_rescheduled():
+    scheduler, clock = make_scheduler()
+    endpoint = Endpoint('https://a')
+    scheduler.add(endpoint)
+    assert scheduler.pop_due() == [endpoint]
+    # Removed while its probe was in flight
+    scheduler.remove(endpoint)
+    scheduler.reschedule(endpoint)
+    assert endpoint not in scheduler
+    assert scheduler.next_due() is None
+
+
+def test_removal_survives_compaction():
+    scheduler, clock = make_scheduler()
+    endpoints = [Endpoint(f"https://{i}", jitter=0) for i in range(100)]
+    for i, endpoint in enumerate(endpoints):
+        scheduler.add(endpoint, i)
+    for endpoint in endpoints[::2]:
+        scheduler.remove(endpoint)
+    assert scheduler.pop_due(1000) == endpoints[1::2]
+
+
+def test_add_spread_spaces_first_probes_over_shortest_interval():
+    scheduler, clock = make_scheduler()
+    endpoints = [Endpoint(f"https://{i}", interval=40) for i in range(4)]
+    endpoints.append(Endpoint('https://slow', interval=600))
+    scheduler.add_spread(endpoints)
+    due = [scheduler.next_due()]
+    while scheduler.pop_due(due[-1]):
+        due.append(scheduler.next_due())
+    assert due[:-1] == [0, 8, 16, 24, 32]
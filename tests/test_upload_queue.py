@@ -0,0 +1,70 @@
+import os
+
+import pytest
+
+from benchmarks.collector import start_in_thread
+from services.probe_engine import Endpoint, ProbeResult
+from services.upload_queue import UploadQueue
+
+
+@pytest.fixture
+def collector():
+    server, port = start_in_thread()
+    yield server, f"http://127.0.0.1:{port}/results"
+    server.shutdown()
+
+
+def put_results(queue, count):
+    endpoint = Endpoint('https://example.com')
+    for i in range(count):
+        result = ProbeResult(endpoint, True, status_code=200, latency=0.1)
+        result.timestamp = 1700000000.0 + i
+        queue.put(result)
+
+
+def test_pending_records_survive_a_restart(tmp_path, collector):
+    server, url = collector
+    queue = UploadQueue(str(tmp_path), url, batch_size=10, segment_records=25, log=lambda message: None)
+    put_results(queue, 60)
+    queue.stop()
+
+    queue = UploadQueue(str(tmp_path), url, batch_size=10, segment_records=25, log=lambda message: None)
+    assert queue.pending() == 60
+    assert queue.flush()
+    assert [record['seq'] for _, record in server.records] == list(range(1, 61))
+    queue.stop()
+
+    queue = UploadQueue(str(tmp_path), url, log=lambda message: None)
+    assert queue.pending() == 0
+    assert queue.last_seq == 60
+    queue.stop()
+
+
+def test_torn_last_record_is_dropped(tmp_path, collector):
+    server, url = collector
+    queue = UploadQueue(str(tmp_path), url, log=lambda message: None)
+    put_results(queue, 5)
+    queue.stop()
+    segment = max(n for n in os.listdir(tmp_path) if n.startswith('segment-'))
+    with open(tmp_path / segment, 'ab') as f:
+        f.write(b'{"seq":6,"ts":')
+
+    queue = UploadQueue(str(tmp_path), url, log=lambda message: None)
+    assert queue.last_seq == 5
+    assert queue.flush()
+    assert [record['seq'] for _, record in server.records] == [1, 2, 3, 4, 5]
+    queue.stop()
+
+
+def test_failed_upload_keeps_records(tmp_path, collector):
+    server, url = collector
+    server.fail_every = 1
+    queue = UploadQueue(str(tmp_path), url, log=lambda message: None)
+    put_results(queue, 3)
+    assert not queue.flush()
+    assert queue.pending() == 3
+    server.fail_every = 0
+    assert queue.flush()
+    assert queue.pending() == 0
+    assert len(server.records) == 3
+    queue.stop()
@@ -0,0 +1,165 @@
+import pytest
+
+from services.wake_policy import (
+    WakePolicy, PowerState, MODE_ALIGNED, MODE_BATTERY, MODE_CONTINUOUS,
+    DOZE_STRETCH, LOW_BATTERY_STRETCH, POWER_CHECK_INTERVAL,
+)
+
+
+class FakeClock:
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+class FakePower:
+    def __init__(self, state=None):
+        self.state = state or PowerState()
+        self.reads = 0
+
+    def read(self):
+        self.reads += 1
+        return self.state
+
+
+class FakeAlarm:
+    def __init__(self):
+        self.scheduled = []
+        self.callback = None
+
+    def start(self, callback):
+        self.callback = callback
+
+    def schedule(self, delay, window):
+        self.scheduled.append((delay, window))
+
+
+def make_policy(mode, window=30, state=None):
+    clock, power, alarm = FakeClock(), FakePower(state), FakeAlarm()
+    return WakePolicy(mode, window, power=power, alarm=alarm, clock=clock), clock, power, alarm
+
+
+def test_unknown_mode_is_rejected():
+    with pytest.raises(ValueError):
+        WakePolicy('sometimes')
+
+
+def test_continuous_mode_is_a_pass_through():
+    policy, clock, _, alarm = make_policy(MODE_CONTINUOUS)
+    assert policy.slot(1012.3) == 1012.3
+    assert policy.cutoff(1005.0) == 1005.0
+    assert policy.delay(1012.0, 1005.0) == 7.0
+    assert policy.interval(10) == 10
+    assert alarm.scheduled == []
+
+
+def test_slot_rounds_to_nearest_window():
+    policy, *_ = make_policy(MODE_ALIGNED)
+    assert policy.slot(1014.0) == 1020
+    assert policy.slot(1004.0) == 990
+    assert policy.slot(1020.0) == 1020
+
+
+def test_cutoff_covers_everything_whose_slot_was_reached():
+    policy, *_ = make_policy(MODE_ALIGNED)
+    # Woken at the 1020 slot: due times up to 1035 round to it
+    assert policy.cutoff(1020.0) == 1035
+    # A wakeup between slots does not pull in the next slot's probes
+    assert policy.cutoff(1029.0) == 1035
+
+
+def test_delay_sleeps_until_slot_and_schedules_one_alarm_per_slot():
+    policy, _, _, alarm = make_policy(MODE_ALIGNED)
+    assert policy.delay(1044.0, 1021.0) == 29.0
+    assert policy.delay(1046.0, 1022.0) == 28.0
+    assert alarm.scheduled == [(29.0, 30)]
+    assert policy.delay(None, 1022.0) is None
+    assert policy.delay(1000.0, 1022.0) == 0.0
+
+
+def test_aligned_intervals_are_at_least_one_window():
+    policy, *_ = make_policy(MODE_ALIGNED)
+    assert policy.interval(10) == 30
+    assert policy.interval(60) == 60
+
+
+def test_battery_mode_stretches_on_low_battery_and_doze():
+    policy, clock, power, _ = make_policy(MODE_BATTERY)
+    assert policy.stretch() == 1
+
+    power.state = PowerState(level=15, charging=False)
+    clock.now += POWER_CHECK_INTERVAL
+    assert policy.stretch() == LOW_BATTERY_STRETCH
+    assert policy.interval(60) == 60 * LOW_BATTERY_STRETCH
+
+    power.state = PowerState(level=15, charging=True)
+    clock.now += POWER_CHECK_INTERVAL
+    assert policy.stretch() == 1
+
+    power.state = PowerState(idle=True)
+    clock.now += POWER_CHECK_INTERVAL
+    assert policy.stretch() == DOZE_STRETCH
+
+
+def test_power_state_is_cached_between_checks():
+    policy, clock, power, _ = make_policy(MODE_BATTERY)
+    policy.stretch()
+    clock.now += POWER_CHECK_INTERVAL - 1
+    policy.stretch()
+    assert power.reads == 1
+    clock.now += 1
+    policy.stretch()
+    assert power.reads == 2
+
+
+def test_only_battery_mode_reads_power():
+    policy, _, power, _ = make_policy(MODE_ALIGNED, state=PowerState(idle=True))
+    assert policy.interval(60) == 60
+    assert power.reads == 0
+
+
+def test_bind_routes_alarms_to_the_loop():
+    woken = []
+    policy, _, _, alarm = make_policy(MODE_ALIGNED)
+    policy.bind(lambda: woken.append(True))
+    alarm.callback()
+    assert woken == [True]
+
+    continuous, _, _, alarm = make_policy(MODE_CONTINUOUS)
+    continuous.bind(lambda: None)
+    assert alarm.callback is None
+
+
+def test_housekeeping_rides_on_aligned_wakeups():
+    import asyncio
+    import time
+
+    from benchmarks.standin import start_in_thread
+    from services.probe_engine import Endpoint, ProbeEngine
+    from services.scheduler import EndpointScheduler
+
+    server, port = start_in_thread()
+    policy = WakePolicy(MODE_ALIGNED, window=1)
+    scheduler = EndpointScheduler(clock=policy.clock)
+    scheduler.add(Endpoint(f"http://127.0.0.1:{port}/", interval=1, jitter=0))
+    engine = ProbeEngine(concurrency=1)
+    start = time.monotonic()
+    calls = []
+
+    def housekeeping():
+        calls.append(time.monotonic())
+        if time.monotonic() - start >= 2.5:
+            engine.stop()
+
+    try:
+        asyncio.run(asyncio.wait_for(engine.run_forever(
+            scheduler, lambda result: None, housekeeping=housekeeping,
+            housekeeping_interval=0.05, wake_policy=policy
+        ), 10))
+    finally:
+        engine.close()
+        server.shutdown()
+    # One call per aligned wakeup, not one every 50 ms
+    assert len(calls) <= 5